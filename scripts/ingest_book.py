@@ -1,58 +1,163 @@
 import os
 import shutil
 import sys
+import time
 import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from dotenv import load_dotenv
-from typing import List
-from langchain.docstore.document import Document
+from typing import List, Optional, Tuple
 
 # Add the parent directory to the system path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
     from langchain_community.document_loaders import PyPDFLoader
-    from langchain_google_genai import GoogleGenerativeAIEmbeddings
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
     from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import Embeddings
 except ImportError:
     print("One or more required libraries are not installed.")
     print("Please run: pip install pypdf langchain-google-genai langchain faiss-cpu")
     sys.exit(1)
 
+# Project modules are imported outside the check above, so that a broken import
+# in the backend shows its real traceback instead of a pip install hint
+from src.backend.core.embeddings import get_embeddings, write_index_embedding_info
+from src.backend.core.chapters import extract_outline, build_chapter_index, page_sections, save_chapter_index
+
 # --- CONFIGURATION ---
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
 VECTOR_STORE_DIR = os.path.join(os.path.dirname(__file__), '..', 'vector_store')
 
+# Number of texts sent to the embedding API per rate-limiter slot when rate limiting
+# is enabled (the Gemini API's per-request maximum)
+EMBED_BATCH_SIZE = 100
+
+# --- RATE LIMITING ---
+class RateLimiter:
+    """
+    Spaces out embedding requests so that all worker processes together stay under
+    `requests_per_minute`. The next free slot lives in shared memory, so a single
+    limiter created in the parent process is shared by every worker.
+    A limit of 0 disables rate limiting.
+    """
+    def __init__(self, requests_per_minute: float = 0):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = multiprocessing.Value('d', 0.0)
+
+    def acquire(self):
+        """Blocks until the caller may send one request."""
+        if not self.interval:
+            return
+        with self._next_slot.get_lock():
+            now = time.time()
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class RateLimitedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so that every API request goes through the rate limiter.
+    Without a limit, texts are passed through unchanged and the model batches them
+    itself (e.g. by EMBEDDING_BATCH_SIZE for the local embedder).
+    """
+    def __init__(self, embeddings: Embeddings, rate_limiter: RateLimiter, batch_size: int = EMBED_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.rate_limiter = rate_limiter
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not self.rate_limiter.interval:
+            return self.embeddings.embed_documents(texts)
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            self.rate_limiter.acquire()
+            vectors.extend(self.embeddings.embed_documents(texts[start:start + self.batch_size]))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        self.rate_limiter.acquire()
+        return self.embeddings.embed_query(text)
+
+# Set in each worker process by the pool initializer
+_worker_rate_limiter: Optional[RateLimiter] = None
+_worker_started = None
+
+def _init_worker(rate_limiter: RateLimiter, started):
+    global _worker_rate_limiter, _worker_started
+    _worker_rate_limiter = rate_limiter
+    _worker_started = started
+
+def _ingest_in_worker(file_path: str, book_id: str) -> dict:
+    # Record the book before starting on it, so the parent knows which books were
+    # in flight if this process dies
+    _worker_started.append(book_id)
+    return create_vector_db_for_book(file_path, book_id)
+
 # --- CORE LOGIC ---
-def create_vector_db_for_book(file_path: str, book_id: str):
-    """Creates and saves a FAISS vector store for a single book."""
-    print(f"\n--- Processing book: {book_id} ---")
+def create_vector_db_for_book(file_path: str, book_id: str, rate_limiter: Optional[RateLimiter] = None) -> dict:
+    """
+    Creates and saves a FAISS vector store for a single book.
+    Errors are caught and reported in the returned stats, so one bad PDF never
+    stops the rest of the pipeline.
+    """
+    def log(message: str, error: bool = False):
+        # Errors go to stderr, where callers such as the upload endpoint look for them
+        print(f"[{book_id}] {message}", file=sys.stderr if error else sys.stdout, flush=True)
+
+    rate_limiter = rate_limiter or _worker_rate_limiter or RateLimiter()
+    stats = {"book_id": book_id, "ok": False, "pages": 0, "chunks": 0, "seconds": 0.0, "error": None}
+    started = time.perf_counter()
+
+    log("Processing book...")
     if not os.path.exists(file_path):
-        print(f"Error: File not found at {file_path}")
-        return
+        stats["error"] = f"File not found at {file_path}"
+        log(f"Error: {stats['error']}", error=True)
+        return stats
 
     try:
         loader = PyPDFLoader(file_path=file_path)
         documents = loader.load()
-        print(f"-> Loaded {len(documents)} pages.")
+        stats["pages"] = len(documents)
+        log(f"-> Loaded {len(documents)} pages.")
+
+        # Build the chapter index from the PDF outline and tag every page with its section;
+        # the splitter copies page metadata onto each chunk.
+        num_pages = max((doc.metadata.get('page', 0) for doc in documents), default=-1) + 1
+        chapters = build_chapter_index(extract_outline(file_path), num_pages)
+        sections = page_sections(chapters, num_pages)
+        for doc in documents:
+            section = sections[doc.metadata.get('page', 0)]
+            if section is not None:
+                doc.metadata['section'] = section['title']
+                doc.metadata['chapter'] = section['chapter']
+        log(f"-> Found {len(chapters)} outline sections.")
 
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
         docs = text_splitter.split_documents(documents)
-        print(f"-> Split into {len(docs)} chunks.")
+        stats["chunks"] = len(docs)
+        log(f"-> Split into {len(docs)} chunks.")
 
         for doc in docs:
             doc.page_content = doc.page_content.encode('utf-8', 'ignore').decode('utf-8')
 
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+        # The provider is selected through EMBEDDING_PROVIDER in the backend settings
+        embeddings = RateLimitedEmbeddings(get_embeddings(), rate_limiter)
 
-        print("-> Creating FAISS index...")
+        log("-> Creating FAISS index...")
         db = FAISS.from_documents(docs, embeddings)
 
         # --- ATOMIC SAVE ---
         # 1. Save to a temporary directory
         temp_dir = os.path.join(VECTOR_STORE_DIR, f"temp_{book_id}_{os.getpid()}")
         db.save_local(temp_dir)
+        # Record the embedding model so mismatched loads can be rejected
+        write_index_embedding_info(temp_dir)
+        save_chapter_index(temp_dir, chapters)
 
         # 2. Rename the directory to the final name
         final_dir = os.path.join(VECTOR_STORE_DIR, book_id)
@@ -60,19 +165,73 @@ def create_vector_db_for_book(file_path: str, book_id: str):
             shutil.rmtree(final_dir) # Remove old version if it exists
         os.rename(temp_dir, final_dir)
 
-        print(f"-> FAISS index saved to: {final_dir}")
+        stats["ok"] = True
+        log(f"-> FAISS index saved to: {final_dir}")
 
     except Exception as e:
-        print(f"!!-> Failed to process {book_id}. Error: {e}")
+        stats["error"] = str(e)
+        log(f"!!-> Failed to process {book_id}. Error: {e}", error=True)
         # Clean up temporary directory if it exists
         if 'temp_dir' in locals() and os.path.exists(temp_dir):
             shutil.rmtree(temp_dir)
 
-def run_ingestion_pipeline(target_file: str = None):
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
+
+def print_summary(results: List[dict], elapsed: float):
+    """Prints the per-run totals and throughput."""
+    pages = sum(r["pages"] for r in results if r["ok"])
+    chunks = sum(r["chunks"] for r in results if r["ok"])
+    failed = [r for r in results if not r["ok"]]
+    print("\n--- Ingestion summary ---")
+    print(f"Books: {len(results) - len(failed)} succeeded, {len(failed)} failed, in {elapsed:.1f}s")
+    if elapsed > 0:
+        print(f"Throughput: {pages / elapsed:.2f} pages/sec, {chunks / elapsed:.2f} chunks/sec ({pages} pages, {chunks} chunks)")
+    for r in failed:
+        print(f"  FAILED {r['book_id']}: {r['error']}", file=sys.stderr)
+
+def _failed_stats(book_id: str, error: str) -> dict:
+    return {"book_id": book_id, "ok": False, "pages": 0, "chunks": 0, "seconds": 0.0, "error": error}
+
+def _run_worker_pool(jobs: List[tuple], workers: int, rate_limiter: RateLimiter, report) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Ingests `jobs` in a fresh process pool, reporting each finished book.
+    A worker that dies (e.g. out of memory on a huge PDF) breaks the whole pool and
+    fails every pending future, so instead of reporting those books as failed this
+    returns the unfinished jobs as (in flight when the pool broke, not yet started).
+    Both lists are empty if the pool did not break.
+    """
+    with multiprocessing.Manager() as manager:
+        started = manager.list()
+        finished = set()
+        broken = False
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rate_limiter, started)) as executor:
+            futures = {executor.submit(_ingest_in_worker, file_path, book_id): book_id for file_path, book_id in jobs}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    continue
+                except Exception as e:
+                    result = _failed_stats(futures[future], repr(e))
+                finished.add(futures[future])
+                report(result)
+        started = set(started)
+
+    if not broken:
+        return [], []
+    unfinished = [job for job in jobs if job[1] not in finished]
+    return [job for job in unfinished if job[1] in started], [job for job in unfinished if job[1] not in started]
+
+def run_ingestion_pipeline(target_file: str = None, workers: int = 1, embed_rpm: float = 0) -> List[dict]:
     """
     Main ingestion pipeline.
     If a target_file is provided, it processes only that file.
     Otherwise, it processes all PDF files in the data directory.
+    With workers > 1, books are ingested in parallel worker processes that share
+    a single embedding rate limiter of `embed_rpm` requests per minute.
+    Returns the stats of every processed book.
     """
     if not os.path.exists(VECTOR_STORE_DIR):
         os.makedirs(VECTOR_STORE_DIR)
@@ -82,29 +241,72 @@ def run_ingestion_pipeline(target_file: str = None):
         pdf_files = [target_file] if target_file.endswith('.pdf') else []
         if not os.path.exists(os.path.join(DATA_DIR, target_file)):
              print(f"Specified file '{target_file}' not found in data directory.")
-             return
+             return []
     else:
         pdf_files = [f for f in os.listdir(DATA_DIR) if f.endswith('.pdf')]
     
     if not pdf_files:
         print(f"No PDF files found to process.")
-        return
+        return []
 
     print(f"Found {len(pdf_files)} book(s) to process.")
-    
-    for pdf_file in pdf_files:
-        file_path = os.path.join(DATA_DIR, pdf_file)
-        book_id = os.path.splitext(pdf_file)[0]
-        create_vector_db_for_book(file_path, book_id)
 
+    rate_limiter = RateLimiter(embed_rpm)
+    jobs = [(os.path.join(DATA_DIR, pdf_file), os.path.splitext(pdf_file)[0]) for pdf_file in pdf_files]
+    results = []
+    started = time.perf_counter()
+
+    def report(result: dict):
+        results.append(result)
+        status = "done" if result["ok"] else "FAILED"
+        done_pages = sum(r["pages"] for r in results if r["ok"])
+        elapsed = time.perf_counter() - started
+        print(f"[{len(results)}/{len(jobs)}] {status}: {result['book_id']} "
+              f"({result['pages']} pages, {result['chunks']} chunks, {result['seconds']}s) "
+              f"- overall {done_pages / elapsed:.2f} pages/sec", flush=True)
+
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        for file_path, book_id in jobs:
+            report(create_vector_db_for_book(file_path, book_id, rate_limiter))
+    else:
+        print(f"Ingesting with {workers} worker processes.")
+        remaining = jobs
+        while remaining:
+            in_flight, not_started = _run_worker_pool(remaining, workers, rate_limiter, report)
+            if not in_flight and not not_started:
+                break
+            if not in_flight:
+                # The pool broke before any book started (e.g. workers cannot spawn)
+                for _, book_id in not_started:
+                    report(_failed_stats(book_id, "Worker pool broke before the book was started."))
+                break
+            # A worker died. Only the books in flight can be the cause: retry each of
+            # them alone to find the culprit, and resubmit the rest to a fresh pool.
+            if len(in_flight) > 1:
+                print(f"A worker process died; retrying {len(in_flight)} in-flight book(s) one at a time.", file=sys.stderr)
+            for job in in_flight:
+                crashed, _ = _run_worker_pool([job], 1, rate_limiter, report)
+                for _, book_id in crashed:
+                    report(_failed_stats(book_id, "Worker process died while ingesting this book."))
+            remaining = not_started
+
+    print_summary(results, time.perf_counter() - started)
     print("\n--- Data ingestion complete. ---")
+    return results
 
 if __name__ == "__main__":
     # Set up argument parser to handle command-line arguments
     parser = argparse.ArgumentParser(description="Process PDF books into a vector store.")
     parser.add_argument("--file", type=str, help="The specific filename of the book to process in the 'data' directory.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of books to ingest in parallel (worker processes).")
+    parser.add_argument("--embed-rpm", type=float, default=0, help="Maximum embedding requests per minute across all workers (0 = unlimited).")
     
     args = parser.parse_args()
     
     # Run the pipeline with the specific file if provided, otherwise run for all files.
-    run_ingestion_pipeline(target_file=args.file)
+    results = run_ingestion_pipeline(target_file=args.file, workers=args.workers, embed_rpm=args.embed_rpm)
+
+    # A non-zero exit code lets callers (e.g. the upload endpoint) detect failed books
+    if any(not r["ok"] for r in results):
+        sys.exit(1)
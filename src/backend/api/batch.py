@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import HumanMessage
+
+# Import from our project structure
+from ..schemas.chat_schemas import BatchChatRequest, BatchChatItem
+from ..core.graph import get_graph
+from ..core.agents import AgentState
+from ..core.rag import load_vector_store
+from ..core.settings import settings
+
+router = APIRouter()
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def _answer_item(index: int, item: BatchChatItem, semaphore: asyncio.Semaphore) -> dict:
+    """Runs one question through the compiled graph, without any chat history."""
+    async with semaphore:
+        started = time.perf_counter()
+        result = {"index": index, "id": item.id, "book_id": item.book_id, "question": item.question}
+        try:
+            initial_state = AgentState(
+                question=item.question,
+                book_id=item.book_id,
+                messages=[HumanMessage(content=item.question)]
+            )
+            final_state = await get_graph().ainvoke(initial_state, {'recursion_limit': 15})
+            result["answer"] = final_state["messages"][-1].content
+            result["error"] = None
+        except Exception as e:
+            result["answer"] = None
+            result["error"] = str(e)
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+async def batch_stream_generator(request: BatchChatRequest, concurrency: int):
+    """
+    Streams one NDJSON line per item as soon as it finishes (not in request order),
+    followed by a final summary line with latency percentiles and throughput.
+    """
+    started = time.perf_counter()
+
+    # Run items grouped by book: the semaphore admits tasks in creation order, so each
+    # book's items run together while its index is in the cache, and a book is loaded
+    # once even when the batch covers more books than the index cache can hold.
+    order = sorted(range(len(request.items)), key=lambda i: request.items[i].book_id)
+    book_ids = list(dict.fromkeys(request.items[i].book_id for i in order))
+
+    # Prewarm only as many books as the cache holds; later books load as their turn comes
+    prewarm = book_ids[:settings.RETRIEVER_CACHE_SIZE]
+    await asyncio.gather(*(asyncio.to_thread(load_vector_store, book_id) for book_id in prewarm), return_exceptions=True)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.create_task(_answer_item(i, request.items[i], semaphore)) for i in order]
+    latencies, failed = [], 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            latencies.append(result["latency_ms"])
+            failed += result["error"] is not None
+            yield json.dumps(result) + "\n"
+    finally:
+        # Stop outstanding work if the client disconnects mid-batch
+        for task in tasks:
+            task.cancel()
+
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    summary = {
+        "items": len(tasks),
+        "succeeded": len(tasks) - failed,
+        "failed": failed,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_per_second": round(len(tasks) / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+            "max": latencies[-1] if latencies else 0.0,
+        },
+    }
+    print(f"Batch finished: {summary['items']} items in {summary['elapsed_seconds']}s ({summary['throughput_per_second']}/s).")
+    yield json.dumps({"summary": summary}) + "\n"
+
+@router.post("/chat/batch")
+async def batch_chat_endpoint(request: BatchChatRequest):
+    """
+    Answers many independent (book_id, question) items through the agent graph with
+    bounded concurrency, streaming each result back as NDJSON as soon as it is ready.
+    Items carry no chat history and are not saved to the database.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="The batch contains no items.")
+    if len(request.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {settings.BATCH_MAX_ITEMS} items.")
+
+    concurrency = request.concurrency if request.concurrency is not None else settings.BATCH_MAX_CONCURRENCY
+    concurrency = min(concurrency, settings.BATCH_MAX_CONCURRENCY)
+    if concurrency < 1:
+        raise HTTPException(status_code=400, detail="Concurrency must be at least 1.")
+
+    return StreamingResponse(
+        batch_stream_generator(request, concurrency),
+        media_type="application/x-ndjson"
+    )
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import shutil
 import subprocess
@@ -5,6 +6,9 @@ import sys
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
 
+from ..schemas.book_schemas import PrewarmRequest
+from ..core.startup import prewarm, startup_books
+
 # Construct robust paths to necessary directories and scripts from the project root
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 DATA_DIR = os.path.join(project_root, 'data')
@@ -82,3 +86,12 @@ async def list_books():
     except OSError as e:
         raise HTTPException(status_code=500, detail=f"Could not read book directory: {e}")
 
+@router.post("/prewarm")
+async def prewarm_books_endpoint(request: PrewarmRequest):
+    """
+    Loads books into the index cache (and compiles the graph) ahead of traffic,
+    so the first question about a hot book doesn't pay the index load time.
+    """
+    book_ids = request.book_ids if request.book_ids is not None else startup_books()
+    report = await asyncio.to_thread(prewarm, book_ids, request.build_clients)
+    return JSONResponse(content=report)
@@ -1,57 +1,40 @@
 import asyncio
 import json
-import sqlite3
 from fastapi import APIRouter
 from fastapi.responses import StreamingResponse, JSONResponse
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from starlette.background import BackgroundTask
+from langchain_core.messages import HumanMessage
 
 # Import from our project structure
 from ..schemas.chat_schemas import ChatRequest
-from ..core.graph import app
+from ..core.graph import get_graph
 from ..core.agents import AgentState
+from ..core.settings import settings
+from ..core.session_cache import SessionCache
+from ..core.admission import AdmissionController, AdmissionRejected, AdmissionTicket
 
 # --- Database Setup ---
 DB_PATH = "chat_history.db"
 
-def init_db():
-    """Initializes the SQLite database and creates the history table if it doesn't exist."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS chat_history (
-            session_id TEXT NOT NULL,
-            role TEXT NOT NULL,
-            content TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
-    conn.commit()
-    conn.close()
+# Active conversations are served from memory and persisted in the background.
+# The database itself is initialized on first use rather than at import time.
+session_cache = SessionCache(
+    DB_PATH,
+    max_sessions=settings.SESSION_CACHE_MAX_SESSIONS,
+    idle_seconds=settings.SESSION_CACHE_IDLE_SECONDS,
+    flush_interval=settings.SESSION_FLUSH_INTERVAL_SECONDS,
+)
 
-# Initialize the database when the application starts
-init_db()
+# Bounds how many graph runs execute at once and serializes turns per session
+admission = AdmissionController(
+    max_concurrent=settings.CHAT_MAX_CONCURRENCY,
+    max_queue=settings.CHAT_MAX_QUEUE,
+    queue_timeout=settings.CHAT_QUEUE_TIMEOUT_SECONDS,
+    max_pending_per_session=settings.CHAT_MAX_PENDING_PER_SESSION,
+)
 
-def save_message_to_db(session_id: str, role: str, content: str):
-    """Saves a single message to the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO chat_history (session_id, role, content) VALUES (?, ?, ?)", (session_id, role, content))
-    conn.commit()
-    conn.close()
-
-def get_history_from_db(session_id: str) -> list[BaseMessage]:
-    """Retrieves chat history for a session from the database as LangChain objects."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT role, content FROM chat_history WHERE session_id = ? ORDER BY timestamp ASC", (session_id,))
-    history = []
-    for role, content in cursor.fetchall():
-        if role == "user":
-            history.append(HumanMessage(content=content))
-        elif role == "assistant":
-            history.append(AIMessage(content=content))
-    conn.close()
-    return history
+def resolve_session_id(request: ChatRequest) -> str:
+    return request.session_id or f"default_session_{request.book_id}"
 
 # Create an API router
 router = APIRouter()
@@ -62,45 +45,70 @@ async def get_history_endpoint(session_id: str):
     New endpoint to fetch chat history for a specific session ID.
     This will be called by the frontend when switching books.
     """
-    history = get_history_from_db(session_id)
+    history = session_cache.get_history(session_id)
     # Convert LangChain messages to a JSON-serializable list of dicts
     history_dicts = [{"role": "user" if isinstance(msg, HumanMessage) else "assistant", "content": msg.content} for msg in history]
     return JSONResponse(content={"history": history_dicts})
 
 
-async def chat_stream_generator(request: ChatRequest):
+async def chat_stream_generator(request: ChatRequest, ticket: AdmissionTicket):
     """
     This is an async generator that streams the response from our LangGraph agent.
+    It releases the request's admission slot when the stream ends.
     """
-    session_id = request.session_id or f"default_session_{request.book_id}"
-    
-    chat_history = get_history_from_db(session_id)
-    save_message_to_db(session_id, "user", request.question)
+    session_id = resolve_session_id(request)
+    try:
+        chat_history = session_cache.get_history(session_id)
+        session_cache.append(session_id, "user", request.question)
 
-    initial_state = AgentState(
-        question=request.question,
-        book_id=request.book_id,
-        messages=chat_history + [HumanMessage(content=request.question)]
-    )
-    
-    final_answer_content = ""
-    async for event in app.astream(initial_state, {'recursion_limit': 15}):
-        if "generate_final_answer" in event:
-            ai_message = event["generate_final_answer"]["messages"][0]
-            final_answer_content = ai_message.content
-            yield f"data: {json.dumps({'token': final_answer_content})}\n\n"
-            await asyncio.sleep(0.01)
+        initial_state = AgentState(
+            question=request.question,
+            book_id=request.book_id,
+            session_id=session_id,
+            messages=chat_history + [HumanMessage(content=request.question)]
+        )
+        
+        final_answer_content = ""
+        async for event in get_graph().astream(initial_state, {'recursion_limit': 15}):
+            if "generate_final_answer" in event:
+                ai_message = event["generate_final_answer"]["messages"][0]
+                final_answer_content = ai_message.content
+                yield f"data: {json.dumps({'token': final_answer_content})}\n\n"
+                await asyncio.sleep(0.01)
 
-    save_message_to_db(session_id, "assistant", final_answer_content)
-    print(f"Saved conversation for session '{session_id}' to the database.")
+        session_cache.append(session_id, "assistant", final_answer_content)
+        print(f"Queued conversation for session '{session_id}' for saving to the database.")
+    finally:
+        ticket.release()
 
 @router.post("/chat")
 async def chat_endpoint(request: ChatRequest):
     """
     The main chat endpoint. It receives a chat request and returns a
     streaming response from the agent.
+    Requests wait in a bounded queue for a free slot; when the queue is full
+    they are rejected with 429 and a Retry-After header.
     """
+    try:
+        ticket = await admission.acquire(resolve_session_id(request))
+    except AdmissionRejected as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(e)},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
     return StreamingResponse(
-        chat_stream_generator(request), 
-        media_type="text/event-stream"
+        chat_stream_generator(request, ticket), 
+        media_type="text/event-stream",
+        headers={"X-Queue-Wait-Ms": f"{ticket.wait_seconds * 1000:.0f}"},
+        # Also release the slot if the stream is never consumed (release is idempotent)
+        background=BackgroundTask(ticket.release)
     )
+
+@router.get("/chat/stats")
+async def chat_stats_endpoint():
+    """
+    Reports admission queue depth and wait times, and session cache usage.
+    """
+    return JSONResponse(content={"admission": admission.stats(), "session_cache": session_cache.stats()})
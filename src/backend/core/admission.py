@@ -0,0 +1,145 @@
+import asyncio
+import math
+import time
+from typing import Dict
+
+# --- Admission Control ---
+# Every chat request can run up to `recursion_limit` LLM steps, so accepting every
+# request during a burst only piles up work that times out upstream. Requests are
+# admitted through a global concurrency limit with a bounded wait queue; when the
+# queue is full they are rejected immediately with a Retry-After hint. Turns of the
+# same session are also serialized, so their history writes never interleave.
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted. `retry_after` is in whole seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """Held by an admitted request; `release()` frees its slot (safe to call twice)."""
+
+    def __init__(self, controller: "AdmissionController", session_id: str, wait_seconds: float):
+        self.session_id = session_id
+        self.wait_seconds = wait_seconds
+        self._controller = controller
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self, time.monotonic() - self._started)
+
+
+class AdmissionController:
+    """
+    Global and per-session concurrency limiter with a bounded wait queue.
+
+    At most `max_concurrent` requests run at once, at most `max_queue` wait for a
+    slot, and each session may have at most `max_pending_per_session` requests
+    running or waiting, which run one at a time. A request that waits longer than
+    `queue_timeout` seconds is rejected as well.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float, max_pending_per_session: int):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_pending_per_session = max_pending_per_session
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._session_pending: Dict[str, int] = {}
+        self._active = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._last_wait = 0.0
+        # Moving average of how long an admitted request holds its slot
+        self._avg_service = 5.0
+
+    def retry_after(self) -> int:
+        """Estimates how long until a queued request would get a slot."""
+        estimate = self._avg_service * (self._waiting + 1) / self.max_concurrent
+        return max(1, math.ceil(estimate))
+
+    def _reject(self, reason: str):
+        self._rejected += 1
+        raise AdmissionRejected(reason, self.retry_after())
+
+    async def acquire(self, session_id: str) -> AdmissionTicket:
+        """Waits for a slot for this session, or raises AdmissionRejected."""
+        pending = self._session_pending.get(session_id, 0)
+        if pending >= self.max_pending_per_session:
+            self._reject("Too many requests in flight for this session.")
+
+        session_busy = pending > 0
+        if (self._slots.locked() or session_busy) and self._waiting >= self.max_queue:
+            self._reject("The server is busy. Please retry later.")
+
+        session_lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+        self._session_pending[session_id] = pending + 1
+        self._waiting += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._acquire_slot(session_lock), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._forget_session(session_id)
+            self._reject("Timed out waiting for a free slot.")
+        except BaseException:
+            self._forget_session(session_id)
+            raise
+        finally:
+            self._waiting -= 1
+
+        wait = time.monotonic() - started
+        self._active += 1
+        self._admitted += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        self._last_wait = wait
+        return AdmissionTicket(self, session_id, wait)
+
+    async def _acquire_slot(self, session_lock: asyncio.Lock):
+        # Take the session lock first, so a queued turn never holds a global slot idle
+        await session_lock.acquire()
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            session_lock.release()
+            raise
+
+    def _forget_session(self, session_id: str):
+        pending = self._session_pending.get(session_id, 1) - 1
+        if pending > 0:
+            self._session_pending[session_id] = pending
+        else:
+            self._session_pending.pop(session_id, None)
+            self._session_locks.pop(session_id, None)
+
+    def _release(self, ticket: AdmissionTicket, service_seconds: float):
+        self._active -= 1
+        self._avg_service = 0.9 * self._avg_service + 0.1 * service_seconds
+        self._slots.release()
+        session_lock = self._session_locks.get(ticket.session_id)
+        if session_lock is not None and session_lock.locked():
+            session_lock.release()
+        self._forget_session(ticket.session_id)
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active,
+            "queued": self._waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(1000 * self._total_wait / self._admitted, 1) if self._admitted else 0.0,
+            "max_wait_ms": round(1000 * self._max_wait, 1),
+            "last_wait_ms": round(1000 * self._last_wait, 1),
+        }
@@ -1,40 +1,68 @@
 import os
 import operator
-from typing import TypedDict, Annotated, List
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage, SystemMessage
+from functools import lru_cache
+from typing import TypedDict, Annotated, List, Optional
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
 # Use the Pydantic v1 compatibility namespace as recommended by the warning
 from pydantic.v1 import BaseModel, Field 
-from langchain_community.utilities import GoogleSerperAPIWrapper
-from langchain_community.tools import GoogleSerperRun
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from .settings import settings
-from .rag import get_retriever
+from .rag import get_retriever, search_book
+from .memory import conversation_window
 
 # --- 1. Define the Tools our Agents can use ---
+# Clients are built on first use rather than at import time, so importing the API
+# (e.g. at worker boot or test collection) stays fast and works without API keys.
 
-serper_api_wrapper = GoogleSerperAPIWrapper(serper_api_key=settings.SERPER_API_KEY)
-# Give the search tool a very explicit description to help the router.
-web_search_tool = GoogleSerperRun(
-    api_wrapper=serper_api_wrapper,
-    description="A search engine. Use this to search the internet for real-time information, such as weather, news, or current events, or for topics not found in the book."
-)
+@lru_cache(maxsize=1)
+def get_web_search_tool():
+    """Returns the shared Serper web search tool."""
+    from langchain_community.utilities import GoogleSerperAPIWrapper
+    from langchain_community.tools import GoogleSerperRun
+
+    serper_api_wrapper = GoogleSerperAPIWrapper(serper_api_key=settings.SERPER_API_KEY)
+    # Give the search tool a very explicit description to help the router.
+    return GoogleSerperRun(
+        api_wrapper=serper_api_wrapper,
+        description="A search engine. Use this to search the internet for real-time information, such as weather, news, or current events, or for topics not found in the book."
+    )
 
 
 class BookRetrieverTool(BaseModel):
     """Tool for looking up relevant information from a specific programming book."""
     query: str = Field(description="The query or question to look up in the book.")
+    chapter: Optional[str] = Field(None, description="Optional chapter to restrict the search to, e.g. '7', 'Chapter 7' or part of its title.")
+    start_page: Optional[int] = Field(None, description="Optional first page to search (1-based), using the page numbers cited in earlier results.")
+    end_page: Optional[int] = Field(None, description="Optional last page to search (1-based), using the page numbers cited in earlier results.")
 
     def run(self, book_id: str):
         """Executes the book retrieval, injecting the book_id from the state."""
-        retriever = get_retriever(book_id)
-        if not retriever:
-            return f"Error: Could not find or load the vector store for book_id '{book_id}'."
-        
-        docs = retriever.invoke(self.query)
+        if self.chapter or self.start_page is not None or self.end_page is not None:
+            # Section-filtered search only looks at chunks inside the requested pages.
+            # The model sees 1-based page numbers; the index stores 0-based ones.
+            start_page = max(self.start_page - 1, 0) if self.start_page is not None else None
+            end_page = self.end_page - 1 if self.end_page is not None else None
+            docs, note = search_book(book_id, self.query, chapter=self.chapter, start_page=start_page, end_page=end_page)
+            if note:
+                return note
+        else:
+            retriever = get_retriever(book_id)
+            if not retriever:
+                return f"Error: Could not find or load the vector store for book_id '{book_id}'."
+            docs = retriever.invoke(self.query)
+
         if not docs:
             return "No relevant information found in the book for this query."
-        return "\n\n".join([f"Source: {doc.metadata.get('source', 'N/A')}, Page: {doc.metadata.get('page', 'N/A')}\nContent: {doc.page_content}" for doc in docs])
+        return "\n\n".join([self._format(doc) for doc in docs])
+
+    @staticmethod
+    def _format(doc) -> str:
+        section = doc.metadata.get('section')
+        location = f"Section: {section}, " if section else ""
+        page = doc.metadata.get('page')
+        # Chunk metadata holds 0-based page indexes; cite pages as a reader counts them
+        page = page + 1 if isinstance(page, int) else 'N/A'
+        return f"Source: {doc.metadata.get('source', 'N/A')}, {location}Page: {page}\nContent: {doc.page_content}"
 
 # --- 2. Define the State for our Graph ---
 
@@ -42,6 +70,7 @@ class AgentState(TypedDict):
     """The shared memory that flows through the graph."""
     question: str
     book_id: str
+    session_id: str
     messages: Annotated[List[BaseMessage], operator.add]
     next: str
 
@@ -50,7 +79,7 @@ class AgentState(TypedDict):
 ROUTER_SYSTEM_PROMPT = """You are an expert AI agent that acts as a router. Your only job is to decide the next step in a workflow. Do not answer the user's question directly.
 
 You have these tools available:
-- `BookRetrieverTool`: Use this for questions about the content of a specific book.
+- `BookRetrieverTool`: Use this for questions about the content of a specific book. If the user refers to a specific chapter or page range (e.g., "in chapter 7", "on pages 120-130"), set `chapter` or `start_page`/`end_page` to restrict the search.
 - `google_serper`: Use this for questions that require real-time information or a web search (e.g., weather, news, current events).
 
 **Your Decision Process:**
@@ -68,23 +97,31 @@ Choose the single best tool or the `generate_final_answer` step.
 
 FINAL_ANSWER_SYSTEM_PROMPT = """You are an expert AI programming assistant generating a final answer. The conversation history may contain context from a book, a web search, or neither.
 
--   If the history contains book context, use it as your primary source and cite the page number if available.
+-   If the history contains book context, use it as your primary source and cite the section title and page number if available.
 -   If the history contains web search context, synthesize it into your answer.
 -   If the history contains no tool output (because the router sent the user here directly), you MUST answer from your own knowledge and state that the information is not from the provided book. For example: "I couldn't find a specific answer for that in the book, but here is a general explanation..."
 -   If the input was simply conversational, provide a friendly, conversational response.
 """
 
-llm = ChatGoogleGenerativeAI(model=settings.LLM_MODEL, temperature=0)
-llm_with_tools = llm.bind_tools([web_search_tool, BookRetrieverTool])
+@lru_cache(maxsize=1)
+def get_llm():
+    """Returns the shared Gemini chat model."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=settings.LLM_MODEL, temperature=0)
+
+@lru_cache(maxsize=1)
+def get_llm_with_tools():
+    """Returns the chat model bound to the router's tools."""
+    return get_llm().bind_tools([get_web_search_tool(), BookRetrieverTool])
 
 def agent_router(state: AgentState) -> dict:
     """
     The primary agent node. It analyzes intent and decides the next action.
     """
     print("---AGENT ROUTER (TRIAGE)---")
-    messages_with_prompt = [SystemMessage(content=ROUTER_SYSTEM_PROMPT)] + state['messages']
+    messages_with_prompt = conversation_window.build(ROUTER_SYSTEM_PROMPT, state['messages'], state.get('session_id'))
     
-    response = llm_with_tools.invoke(messages_with_prompt)
+    response = get_llm_with_tools().invoke(messages_with_prompt)
     
     if not response.tool_calls:
         print("-> Decision: No tool call needed. Proceeding to generate final answer.")
@@ -98,9 +135,9 @@ def generate_final_answer_node(state: AgentState) -> dict:
     Generates the final response to the user using the dedicated final answer prompt.
     """
     print("---GENERATE FINAL ANSWER---")
-    messages_with_prompt = [SystemMessage(content=FINAL_ANSWER_SYSTEM_PROMPT)] + state['messages']
+    messages_with_prompt = conversation_window.build(FINAL_ANSWER_SYSTEM_PROMPT, state['messages'], state.get('session_id'))
     
-    response = llm.invoke(messages_with_prompt)
+    response = get_llm().invoke(messages_with_prompt)
     
     return {"messages": [response]}
 
@@ -108,7 +145,7 @@ def book_retriever_node(state: AgentState) -> dict:
     """Executes the book retrieval tool."""
     print("---BOOK RETRIEVER---")
     tool_call = state['messages'][-1].tool_calls[0]
-    tool = BookRetrieverTool(query=tool_call['args']['query'])
+    tool = BookRetrieverTool(**tool_call['args'])
     result = tool.run(book_id=state['book_id'])
     return {"messages": [ToolMessage(content=result, tool_call_id=tool_call['id'])]}
 
@@ -118,5 +155,5 @@ def web_search_node(state: AgentState) -> dict:
     tool_call = state['messages'][-1].tool_calls[0]
     # The tool should be invoked with the entire arguments dictionary,
     # not just the extracted query string.
-    result = web_search_tool.invoke(tool_call['args'])
+    result = get_web_search_tool().invoke(tool_call['args'])
     return {"messages": [ToolMessage(content=result, tool_call_id=tool_call['id'])]}
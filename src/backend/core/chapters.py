@@ -0,0 +1,121 @@
+import json
+import os
+import re
+from typing import List, Optional
+
+# --- Chapter Index ---
+# Built at ingestion time from the PDF outline (bookmarks) and saved next to the
+# FAISS index. Each section maps a range of pages (0-based, like the chunks'
+# `page` metadata) to its title, so chunks can be tagged with their section and
+# searches can be restricted to a single chapter.
+
+CHAPTERS_FILE = "chapters.json"
+
+
+def extract_outline(file_path: str) -> List[dict]:
+    """
+    Reads the PDF outline as a flat list of {"title", "level", "start_page"} entries,
+    in document order. Returns an empty list if the PDF has no usable outline.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    entries = []
+
+    def walk(items, level):
+        for item in items:
+            if isinstance(item, list):
+                # A nested list holds the children of the preceding entry
+                walk(item, level + 1)
+                continue
+            try:
+                page = reader.get_destination_page_number(item)
+            except Exception:
+                continue
+            title = " ".join(str(getattr(item, "title", "") or "").split())
+            if title and page is not None and page >= 0:
+                entries.append({"title": title, "level": level, "start_page": page})
+
+    try:
+        walk(reader.outline, 0)
+    except Exception as e:
+        print(f"Could not read the outline of '{file_path}': {e}")
+        return []
+    return entries
+
+
+def build_chapter_index(outline: List[dict], num_pages: int) -> List[dict]:
+    """
+    Turns outline entries into sections with page ranges. A section ends where the
+    next section at the same or a higher level starts. Each section also records
+    its top-level `chapter` title.
+    """
+    sections = []
+    chapter_title = None
+    for i, entry in enumerate(outline):
+        end_page = num_pages - 1
+        for later in outline[i + 1:]:
+            if later["level"] <= entry["level"]:
+                end_page = max(entry["start_page"], later["start_page"] - 1)
+                break
+        if entry["level"] == 0 or chapter_title is None:
+            chapter_title = entry["title"]
+        sections.append({
+            "title": entry["title"],
+            "level": entry["level"],
+            "chapter": chapter_title,
+            "start_page": entry["start_page"],
+            "end_page": min(end_page, num_pages - 1),
+        })
+    return sections
+
+
+def page_sections(chapters: List[dict], num_pages: int) -> List[Optional[dict]]:
+    """Maps every page to the deepest section that contains it (or None)."""
+    by_page: List[Optional[dict]] = [None] * num_pages
+    # Paint shallow sections first so deeper ones overwrite them
+    for section in sorted(chapters, key=lambda s: s["level"]):
+        for page in range(section["start_page"], min(section["end_page"], num_pages - 1) + 1):
+            by_page[page] = section
+    return by_page
+
+
+def find_section(chapters: List[dict], query: str) -> Optional[dict]:
+    """
+    Resolves a chapter reference such as "7", "Chapter 7" or part of a title to a
+    section. Exact titles win, then chapter numbers, then the shallowest section
+    whose title contains the query.
+    """
+    wanted = " ".join(query.casefold().split())
+    if not wanted:
+        return None
+
+    for section in chapters:
+        if section["title"].casefold() == wanted:
+            return section
+
+    number = re.fullmatch(r"(?:chapter|ch\.?)?\s*(\d+)", wanted)
+    if number:
+        pattern = re.compile(rf"^(?:chapter\s+)?{number.group(1)}\b", re.IGNORECASE)
+        matches = [s for s in chapters if pattern.match(s["title"])]
+        if matches:
+            return min(matches, key=lambda s: s["level"])
+
+    matches = [s for s in chapters if wanted in s["title"].casefold()]
+    if matches:
+        return min(matches, key=lambda s: s["level"])
+    return None
+
+
+def save_chapter_index(index_dir: str, chapters: List[dict]):
+    with open(os.path.join(index_dir, CHAPTERS_FILE), "w", encoding="utf-8") as f:
+        json.dump(chapters, f)
+
+
+def load_chapter_index(index_dir: str) -> List[dict]:
+    """Returns the saved chapter index, or an empty list for books without one."""
+    path = os.path.join(index_dir, CHAPTERS_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .settings import settings
+
+# --- Embedding Providers ---
+# Every FAISS index records which embedding model built it (in EMBEDDING_INFO_FILE),
+# because vectors from different models are not comparable: loading an index with
+# another model would silently return meaningless search results.
+
+EMBEDDING_INFO_FILE = "embedding.json"
+# Indexes built before the provider was recorded all used the Google model
+LEGACY_EMBEDDING_INFO = {"provider": "google", "model": "models/embedding-001"}
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class EmbeddingMismatchError(ValueError):
+    """Raised when an index was built with a different embedding model than the configured one."""
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Local CPU embedder that needs no network access and no model download.
+
+    Texts are tokenized into lowercase words and word bigrams, which are hashed
+    (signed feature hashing) into a fixed-size vector with sublinear term weights and
+    L2 normalization. A whole batch is embedded with vectorized NumPy operations.
+    It is lexical rather than semantic, which is good enough for code-heavy books and
+    makes ingestion, serving and benchmarks fully offline.
+    """
+
+    def __init__(self, dimension: int = 1024, batch_size: int = 256):
+        self.dimension = dimension
+        self.batch_size = batch_size
+        self._hash_cache: dict = {}
+
+    @property
+    def model_name(self) -> str:
+        return f"hashing-v1-{self.dimension}"
+
+    def _features(self, text: str) -> List[str]:
+        words = _TOKEN_PATTERN.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def _hash(self, feature: str) -> int:
+        value = self._hash_cache.get(feature)
+        if value is None:
+            value = zlib.crc32(feature.encode("utf-8"))
+            if len(self._hash_cache) < 1_000_000:
+                self._hash_cache[feature] = value
+        return value
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            rows.extend([row] * len(features))
+            hashes.extend(self._hash(f) for f in features)
+
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        if hashes:
+            hashes = np.asarray(hashes, dtype=np.uint32)
+            columns = hashes % self.dimension
+            # The top bit of the hash decides the sign, which keeps collisions unbiased
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix, (np.asarray(rows), columns), signs)
+
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = [self._embed_batch(texts[start:start + self.batch_size]) for start in range(0, len(texts), self.batch_size)]
+        if not vectors:
+            return []
+        return np.vstack(vectors).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
+
+
+@lru_cache(maxsize=None)
+def get_embeddings(provider: Optional[str] = None) -> Embeddings:
+    """
+    Returns the shared embedding model for a provider (default: EMBEDDING_PROVIDER).
+    Remote clients are imported on first use.
+    """
+    provider = provider or settings.EMBEDDING_PROVIDER
+    if provider == "google":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(model=settings.EMBEDDING_MODEL)
+    if provider == "local":
+        return HashingEmbeddings(dimension=settings.LOCAL_EMBEDDING_DIMENSION, batch_size=settings.EMBEDDING_BATCH_SIZE)
+    raise ValueError(f"Unknown embedding provider '{provider}'. Expected 'google' or 'local'.")
+
+
+def embedding_info(provider: Optional[str] = None) -> dict:
+    """Describes the configured embedding model, as recorded next to each index."""
+    provider = provider or settings.EMBEDDING_PROVIDER
+    if provider == "google":
+        return {"provider": "google", "model": settings.EMBEDDING_MODEL}
+    if provider == "local":
+        return {"provider": "local", "model": get_embeddings(provider).model_name}
+    raise ValueError(f"Unknown embedding provider '{provider}'. Expected 'google' or 'local'.")
+
+
+def write_index_embedding_info(index_dir: str):
+    """Records the configured embedding model in an index directory."""
+    with open(os.path.join(index_dir, EMBEDDING_INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(embedding_info(), f)
+
+
+def read_index_embedding_info(index_dir: str) -> dict:
+    """Returns the embedding model recorded for an index directory."""
+    path = os.path.join(index_dir, EMBEDDING_INFO_FILE)
+    if not os.path.exists(path):
+        return dict(LEGACY_EMBEDDING_INFO)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_index_embedding(index_dir: str):
+    """Raises EmbeddingMismatchError if the index was built with another embedding model."""
+    recorded = read_index_embedding_info(index_dir)
+    configured = embedding_info()
+    if (recorded.get("provider"), recorded.get("model")) != (configured["provider"], configured["model"]):
+        raise EmbeddingMismatchError(
+            f"Index at '{index_dir}' was built with {recorded.get('provider')}/{recorded.get('model')}, "
+            f"but the configured embedding model is {configured['provider']}/{configured['model']}. "
+            "Re-ingest the book or change EMBEDDING_PROVIDER."
+        )
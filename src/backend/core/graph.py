@@ -1,41 +1,52 @@
-from langgraph.graph import StateGraph, END
+from functools import lru_cache
 from langchain_core.messages import HumanMessage
 from .agents import AgentState, agent_router, book_retriever_node, web_search_node, generate_final_answer_node
 
-# --- 1. Define the Graph ---
-workflow = StateGraph(AgentState)
+# The graph is compiled on first use (or during the startup prewarm) rather than
+# at import time, so LangGraph is only imported when it is actually needed.
 
-# --- 2. Add Nodes to the Graph ---
-workflow.add_node("agent", agent_router)
-workflow.add_node("book_retriever", book_retriever_node)
-workflow.add_node("web_search", web_search_node)
-workflow.add_node("generate_final_answer", generate_final_answer_node)
+def build_workflow():
+    """Builds the (uncompiled) triage workflow."""
+    from langgraph.graph import StateGraph, END
 
-# --- 3. Add Edges to the Graph ---
-workflow.set_entry_point("agent")
+    # --- 1. Define the Graph ---
+    workflow = StateGraph(AgentState)
 
-# Add conditional edge from the router
-workflow.add_conditional_edges(
-    "agent",
-    lambda state: state["next"],
-    {
-        # The keys here MUST match the 'name' of the tools
-        "BookRetrieverTool": "book_retriever",
-        "google_serper": "web_search", # Corrected from "GoogleSerperRun"
-        "generate_final_answer": "generate_final_answer"
-    }
-)
+    # --- 2. Add Nodes to the Graph ---
+    workflow.add_node("agent", agent_router)
+    workflow.add_node("book_retriever", book_retriever_node)
+    workflow.add_node("web_search", web_search_node)
+    workflow.add_node("generate_final_answer", generate_final_answer_node)
 
-# After tool nodes run, they loop back to the agent to process the output
-workflow.add_edge("book_retriever", "agent")
-workflow.add_edge("web_search", "agent")
+    # --- 3. Add Edges to the Graph ---
+    workflow.set_entry_point("agent")
 
-# The generation node is the final step, so it connects to the END
-workflow.add_edge("generate_final_answer", END)
+    # Add conditional edge from the router
+    workflow.add_conditional_edges(
+        "agent",
+        lambda state: state["next"],
+        {
+            # The keys here MUST match the 'name' of the tools
+            "BookRetrieverTool": "book_retriever",
+            "google_serper": "web_search", # Corrected from "GoogleSerperRun"
+            "generate_final_answer": "generate_final_answer"
+        }
+    )
+
+    # After tool nodes run, they loop back to the agent to process the output
+    workflow.add_edge("book_retriever", "agent")
+    workflow.add_edge("web_search", "agent")
+
+    # The generation node is the final step, so it connects to the END
+    workflow.add_edge("generate_final_answer", END)
 
+    return workflow
 
 # --- 4. Compile the Graph ---
-app = workflow.compile()
+@lru_cache(maxsize=1)
+def get_graph():
+    """Returns the compiled graph, compiling it on the first call."""
+    return build_workflow().compile()
 
 # --- Example Usage (for testing) ---
 def run_example():
@@ -46,7 +57,7 @@ def run_example():
         messages=[HumanMessage(content="search the Internet: Implementation of GAN in Pytorch. give me a complete code.")]
     )
     # Stream the outputs from the graph
-    for output in app.stream(inputs, {'recursion_limit': 10}):
+    for output in get_graph().stream(inputs, {'recursion_limit': 10}):
         # The output is a dictionary where keys are node names
         for key, value in output.items():
             print(f"Output from node '{key}':")
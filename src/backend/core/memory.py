@@ -0,0 +1,204 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage, SystemMessage
+
+from .settings import settings
+
+# --- Conversation Windowing ---
+# The graph state accumulates the full session history plus every tool call made
+# during the current turn. Sending all of it to the LLM on every step makes prompts
+# grow without limit, so the agent nodes build their prompts through this module:
+# recent turns are kept verbatim within a token budget, older turns are folded into
+# a compact per-session summary that is extended incrementally and cached.
+
+# Maximum number of sessions whose summaries are kept in memory.
+MAX_CACHED_SUMMARIES = 1024
+# Maximum characters kept from each side of a turn when it is folded into the summary.
+SUMMARY_SNIPPET_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English text and code).
+    It only needs to be good enough to keep prompts within a budget.
+    """
+    return len(text) // 4 + 1
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Estimates the prompt tokens used by a single message."""
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return estimate_tokens(content) + 4
+
+
+def split_current_turn(messages: List[BaseMessage]) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+    """
+    Splits the messages into previous turns and the current turn.
+    The current turn starts at the latest HumanMessage and includes any tool calls
+    and tool outputs produced while answering it, which must always be sent verbatim.
+    """
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[:i], messages[i:]
+    return [], list(messages)
+
+
+def _is_conversational(message: BaseMessage) -> bool:
+    """True for user questions and final answers; False for tool calls and tool outputs."""
+    if isinstance(message, ToolMessage):
+        return False
+    if isinstance(message, AIMessage) and message.tool_calls:
+        return False
+    return isinstance(message, (HumanMessage, AIMessage))
+
+
+def _group_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Groups a flat message list into turns, each starting at a HumanMessage."""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _snippet(text: str) -> str:
+    text = " ".join(text.split())
+    if len(text) > SUMMARY_SNIPPET_CHARS:
+        text = text[:SUMMARY_SNIPPET_CHARS].rstrip() + "…"
+    return text
+
+
+def summarize_turn(turn: List[BaseMessage]) -> str:
+    """Builds a one-line extractive summary of a single turn."""
+    question = next((m.content for m in turn if isinstance(m, HumanMessage)), "")
+    answer = next((m.content for m in reversed(turn) if isinstance(m, AIMessage)), "")
+    line = f"- User asked: {_snippet(str(question))}"
+    if answer:
+        line += f" | Assistant answered: {_snippet(str(answer))}"
+    return line
+
+
+def _fingerprint(messages: List[BaseMessage]) -> str:
+    """Identifies a prefix of the history so a cached summary can be safely reused."""
+    digest = hashlib.sha1()
+    for message in messages[-2:]:
+        digest.update(message.type.encode("utf-8"))
+        digest.update(str(message.content).encode("utf-8"))
+    digest.update(str(len(messages)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _SummaryEntry:
+    """Cached summary for the oldest `folded` conversational messages of a session."""
+
+    def __init__(self):
+        self.folded = 0
+        self.fingerprint = _fingerprint([])
+        self.lines: List[str] = []
+
+
+class ConversationWindow:
+    """
+    Builds bounded prompts from the graph's message history.
+
+    Previous turns are reduced to user questions and final answers (old tool outputs
+    are dropped), then the most recent ones are kept verbatim while they fit in
+    `token_budget`. Anything older is folded into a short summary that is cached per
+    session and only extended with the turns that newly fell out of the window.
+    """
+
+    def __init__(self, token_budget: int, summary_token_budget: int, max_sessions: int = MAX_CACHED_SUMMARIES):
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+        self.max_sessions = max_sessions
+        self._summaries: "OrderedDict[str, _SummaryEntry]" = OrderedDict()
+        # Agent nodes run in executor threads, so concurrent sessions share this cache
+        self._lock = threading.Lock()
+
+    def build(self, system_prompt: str, messages: List[BaseMessage], session_id: Optional[str] = None) -> List[BaseMessage]:
+        """Returns the messages to send to the LLM: one system message followed by the window."""
+        previous, current = split_current_turn(messages)
+        history = [m for m in previous if _is_conversational(m)]
+
+        budget = self.token_budget - sum(message_tokens(m) for m in current)
+        turns = _group_turns(history)
+        kept = 0
+        for turn in reversed(turns):
+            cost = sum(message_tokens(m) for m in turn)
+            if cost > budget:
+                break
+            budget -= cost
+            kept += 1
+
+        folded = sum(len(turn) for turn in turns[:len(turns) - kept])
+        summary, folded = self._summary(session_id, history, folded)
+        window = history[folded:]
+
+        if summary:
+            system_prompt = f"{system_prompt}\n\nSummary of the earlier conversation (oldest first):\n{summary}"
+        return [SystemMessage(content=system_prompt)] + window + current
+
+    def _summary(self, session_id: Optional[str], history: List[BaseMessage], folded: int) -> Tuple[str, int]:
+        """
+        Returns the summary of the oldest `folded` history messages and the number of
+        messages it actually covers, which for a cached session may be more.
+        """
+        if session_id is None:
+            if folded == 0:
+                return "", 0
+            lines = [summarize_turn(turn) for turn in _group_turns(history[:folded])]
+            return "\n".join(self._fit(lines)), folded
+
+        with self._lock:
+            entry = self._summaries.get(session_id)
+            if entry is not None and entry.fingerprint != _fingerprint(history[:entry.folded]):
+                # Rewritten history: the cached summary no longer matches it
+                self._summaries.pop(session_id)
+                entry = None
+            # A session's fold point never moves back. A large current turn (tool outputs)
+            # folds more history than the next, smaller turn would; unfolding those turns
+            # again would discard the cached summary and rebuild it on every request.
+            if entry is not None:
+                folded = max(folded, entry.folded)
+            if folded == 0:
+                return "", 0
+            if entry is None:
+                entry = _SummaryEntry()
+            self._summaries[session_id] = entry
+            self._summaries.move_to_end(session_id)
+            while len(self._summaries) > self.max_sessions:
+                self._summaries.popitem(last=False)
+
+            if entry.folded < folded:
+                # Only summarize the turns that fell out of the window since the last call
+                entry.lines.extend(summarize_turn(turn) for turn in _group_turns(history[entry.folded:folded]))
+                entry.lines = self._fit(entry.lines)
+                entry.folded = folded
+                entry.fingerprint = _fingerprint(history[:folded])
+            return "\n".join(entry.lines), folded
+
+    def _fit(self, lines: List[str]) -> List[str]:
+        """Keeps the most recent summary lines that fit in the summary budget."""
+        budget = self.summary_token_budget
+        kept: List[str] = []
+        for line in reversed(lines):
+            budget -= estimate_tokens(line)
+            if budget < 0:
+                break
+            kept.append(line)
+        return list(reversed(kept))
+
+    def forget(self, session_id: str):
+        """Drops the cached summary of a session."""
+        with self._lock:
+            self._summaries.pop(session_id, None)
+
+
+# Single shared window used by the agent nodes
+conversation_window = ConversationWindow(
+    token_budget=settings.HISTORY_TOKEN_BUDGET,
+    summary_token_budget=settings.HISTORY_SUMMARY_TOKEN_BUDGET,
+)
@@ -1,21 +1,54 @@
 import os
-from langchain_community.vectorstores import FAISS
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from .settings import settings
 
-def get_retriever(book_id: str):
+class BookIndex:
+    """
+    A loaded book: its FAISS vector store, its chapter index and, for each vector
+    in the FAISS index, the page of the chunk it came from. The page array is what
+    makes chapter/page filters cheap: candidates are selected before the search.
     """
-    Creates and returns a FAISS retriever for a specific book.
 
-    This function constructs the path to the book's vector store, loads it,
-    and creates a retriever object that can be used to find relevant documents.
+    def __init__(self, db, chapters: List[dict]):
+        import numpy as np
 
-    Args:
-        book_id (str): The unique identifier for the book.
+        self.db = db
+        self.chapters = chapters
+        docstore = db.docstore
+        self.pages = np.full(db.index.ntotal, -1, dtype=np.int64)
+        for faiss_id, doc_id in db.index_to_docstore_id.items():
+            doc = docstore.search(doc_id)
+            page = getattr(doc, "metadata", {}).get("page")
+            if isinstance(page, int):
+                self.pages[faiss_id] = page
 
-    Returns:
-        A LangChain retriever object configured for the specific book.
-        Returns None if the vector store for the book does not exist.
+
+# --- Index Cache ---
+# Loading a FAISS index from disk is by far the most expensive part of a retrieval,
+# so loaded vector stores are kept in a small LRU cache shared by every request.
+# Entries are keyed by index path and validated against the index file's modification
+# time, so a re-ingested book is picked up automatically.
+_index_cache: "OrderedDict[str, Tuple[float, BookIndex]]" = OrderedDict()
+_cache_lock = threading.Lock()
+# One lock per book, so concurrent first requests for a book load it only once
+_load_locks: Dict[str, threading.Lock] = {}
+
+
+def _index_mtime(book_vector_store_path: str) -> float:
+    try:
+        return os.path.getmtime(os.path.join(book_vector_store_path, "index.faiss"))
+    except OSError:
+        return 0.0
+
+
+def load_book_index(book_id: str) -> Optional[BookIndex]:
+    """
+    Returns the loaded index for a book, loading it from disk on a cache miss.
+    Returns None if the vector store for the book does not exist, and raises
+    EmbeddingMismatchError if it was built with a different embedding model.
     """
     # Construct the path to the specific book's vector store
     book_vector_store_path = os.path.join(settings.DB_FAISS_PATH, book_id)
@@ -25,19 +58,151 @@ def get_retriever(book_id: str):
         # In a real app, you might raise a specific HTTP exception here.
         return None
 
-    # Initialize the embedding model specified in our settings
-    embeddings = GoogleGenerativeAIEmbeddings(model=settings.EMBEDDING_MODEL)
+    mtime = _index_mtime(book_vector_store_path)
+    with _cache_lock:
+        cached = _index_cache.get(book_vector_store_path)
+        if cached is not None and cached[0] == mtime:
+            _index_cache.move_to_end(book_vector_store_path)
+            return cached[1]
+        load_lock = _load_locks.setdefault(book_vector_store_path, threading.Lock())
+
+    with load_lock:
+        # Another request may have loaded the book while we were waiting
+        with _cache_lock:
+            cached = _index_cache.get(book_vector_store_path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+        from langchain_community.vectorstores import FAISS
+        from .embeddings import check_index_embedding, get_embeddings
+        from .chapters import load_chapter_index
+
+        # Vectors from another embedding model would produce meaningless results
+        check_index_embedding(book_vector_store_path)
+
+        # Load the FAISS vector store from the local path
+        db = FAISS.load_local(
+            folder_path=book_vector_store_path,
+            embeddings=get_embeddings(),
+            allow_dangerous_deserialization=True # Required for loading local FAISS index
+        )
+        book_index = BookIndex(db, load_chapter_index(book_vector_store_path))
+
+        with _cache_lock:
+            _index_cache[book_vector_store_path] = (mtime, book_index)
+            _index_cache.move_to_end(book_vector_store_path)
+            while len(_index_cache) > settings.RETRIEVER_CACHE_SIZE:
+                _index_cache.popitem(last=False)
+    return book_index
+
+
+def load_vector_store(book_id: str):
+    """
+    Returns the FAISS vector store for a book from the shared index cache.
+    Returns None if the vector store for the book does not exist.
+    """
+    book_index = load_book_index(book_id)
+    return book_index.db if book_index is not None else None
+
+
+def get_retriever(book_id: str):
+    """
+    Creates and returns a FAISS retriever for a specific book.
 
-    # Load the FAISS vector store from the local path
-    db = FAISS.load_local(
-        folder_path=book_vector_store_path, 
-        embeddings=embeddings,
-        allow_dangerous_deserialization=True # Required for loading local FAISS index
-    )
+    The book's vector store is served from the shared index cache and loaded from
+    disk only the first time it is needed (or after the book is re-ingested).
+
+    Args:
+        book_id (str): The unique identifier for the book.
+
+    Returns:
+        A LangChain retriever object configured for the specific book.
+        Returns None if the vector store for the book does not exist.
+    """
+    from .embeddings import EmbeddingMismatchError
+
+    try:
+        db = load_vector_store(book_id)
+    except EmbeddingMismatchError as e:
+        print(f"Refusing to load vector store for book '{book_id}': {e}")
+        return None
+    if db is None:
+        return None
 
     # Convert the vector store into a retriever object
     # 'k=4' means it will retrieve the top 4 most relevant documents
     retriever = db.as_retriever(search_kwargs={'k': 4})
-    
+
     return retriever
 
+
+def search_book(book_id: str, query: str, k: int = 4, chapter: Optional[str] = None,
+                start_page: Optional[int] = None, end_page: Optional[int] = None) -> Tuple[list, Optional[str]]:
+    """
+    Searches a book, optionally restricted to a chapter and/or a page range.
+
+    Only the vectors of chunks inside the requested pages are searched (a FAISS
+    ID selector pre-filters the candidates), rather than searching the whole book
+    and discarding results afterwards. Pages are 0-based, like the chunks' `page`
+    metadata; the note shows them 1-based, as a reader would count them.
+
+    Returns:
+        (documents, note): the matching chunks, and a message explaining an empty
+        result (unknown book, index built with another embedding model, unknown
+        chapter, no pages in range), or None.
+    """
+    import faiss
+    import numpy as np
+    from .chapters import find_section
+    from .embeddings import EmbeddingMismatchError
+
+    try:
+        book_index = load_book_index(book_id)
+    except EmbeddingMismatchError as e:
+        print(f"Refusing to load vector store for book '{book_id}': {e}")
+        return [], f"Error: {e}"
+    if book_index is None:
+        return [], f"Error: Could not find or load the vector store for book_id '{book_id}'."
+
+    low = start_page if start_page is not None else 0
+    high = end_page if end_page is not None else int(book_index.pages.max(initial=0))
+    if chapter:
+        section = find_section(book_index.chapters, chapter)
+        if section is None:
+            if not book_index.chapters:
+                return [], "This book has no chapter index; try a page range instead."
+            titles = ", ".join(s["title"] for s in book_index.chapters if s["level"] == 0)
+            return [], f"No chapter matching '{chapter}'. Available chapters: {titles}"
+        low, high = max(low, section["start_page"]), min(high, section["end_page"])
+
+    candidates = np.nonzero((book_index.pages >= low) & (book_index.pages <= high))[0]
+    if candidates.size == 0:
+        return [], f"No indexed content between pages {low + 1} and {high + 1}."
+
+    db = book_index.db
+    vector = np.array([db.embedding_function.embed_query(query)], dtype=np.float32)
+    if getattr(db, "_normalize_L2", False):
+        faiss.normalize_L2(vector)
+    params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(candidates.astype(np.int64)))
+    _, ids = db.index.search(vector, min(k, candidates.size), params=params)
+
+    docs = [db.docstore.search(db.index_to_docstore_id[i]) for i in ids[0] if i != -1]
+    return docs, None
+
+
+def prewarm_books(book_ids: List[str]) -> Dict[str, dict]:
+    """
+    Loads the given books into the index cache ahead of the first request.
+    Returns, for each book, whether it was loaded and how long it took.
+    """
+    results = {}
+    for book_id in book_ids:
+        started = time.perf_counter()
+        try:
+            loaded = load_vector_store(book_id) is not None
+            error = None if loaded else "Vector store not found."
+        except Exception as e:
+            loaded, error = False, str(e)
+        results[book_id] = {"loaded": loaded, "seconds": round(time.perf_counter() - started, 3), "error": error}
+        print(f"Prewarm '{book_id}': {'loaded' if loaded else 'failed'} in {results[book_id]['seconds']}s")
+    return results
@@ -0,0 +1,197 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+
+# --- Chat History Persistence ---
+
+def init_db(db_path: str):
+    """Initializes the SQLite database and creates the history table if it doesn't exist."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chat_history (
+            session_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    conn.commit()
+    conn.close()
+
+def to_message(role: str, content: str) -> Optional[BaseMessage]:
+    """Converts a stored (role, content) row into a LangChain message."""
+    if role == "user":
+        return HumanMessage(content=content)
+    if role == "assistant":
+        return AIMessage(content=content)
+    return None
+
+def load_history(db_path: str, session_id: str) -> List[BaseMessage]:
+    """Reads the full history of a session from the database as LangChain objects."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    # Batched writes share a timestamp, so the rowid keeps insertion order stable
+    cursor.execute("SELECT role, content FROM chat_history WHERE session_id = ? ORDER BY timestamp ASC, rowid ASC", (session_id,))
+    history = [msg for msg in (to_message(role, content) for role, content in cursor.fetchall()) if msg is not None]
+    conn.close()
+    return history
+
+def save_messages(db_path: str, rows: List[Tuple[str, str, str]]):
+    """Saves a batch of (session_id, role, content) rows in a single transaction."""
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany("INSERT INTO chat_history (session_id, role, content) VALUES (?, ?, ?)", rows)
+    conn.close()
+
+# --- Write-Behind Session Cache ---
+
+class _CachedSession:
+    def __init__(self, messages: List[BaseMessage]):
+        self.messages = messages
+        self.last_access = time.monotonic()
+
+
+class SessionCache:
+    """
+    In-memory cache of active conversations with write-behind persistence.
+
+    Histories are loaded from SQLite once, on the first access to a session, and then
+    served from memory. New messages update the cached history immediately and are
+    queued; a background task flushes the queue to SQLite in batched transactions.
+    Sessions are evicted when the cache exceeds `max_sessions` (least recently used
+    first) or after `idle_seconds` without access. `stop()` flushes everything still
+    queued, so nothing is lost on a graceful shutdown. When the background task is not
+    running (e.g. in scripts or tests), writes are flushed immediately.
+    """
+
+    def __init__(self, db_path: str, max_sessions: int, idle_seconds: float, flush_interval: float):
+        self.db_path = db_path
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self._sessions: "OrderedDict[str, _CachedSession]" = OrderedDict()
+        self._pending: List[Tuple[str, str, str]] = []
+        self._inflight: List[Tuple[str, str, str]] = []
+        # Guards the in-memory structures
+        self._lock = threading.Lock()
+        # Serializes database access so a cache miss never races a flush in progress
+        self._db_lock = threading.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._db_ready = False
+
+    def _ensure_db(self):
+        """Creates the history table on first database access. Call with `_db_lock` held."""
+        if not self._db_ready:
+            init_db(self.db_path)
+            self._db_ready = True
+
+    def get_history(self, session_id: str) -> List[BaseMessage]:
+        """Returns a copy of the session's history, loading it from SQLite on a miss."""
+        with self._lock:
+            cached = self._sessions.get(session_id)
+            if cached is not None:
+                self.hits += 1
+                cached.last_access = time.monotonic()
+                self._sessions.move_to_end(session_id)
+                return list(cached.messages)
+            self.misses += 1
+
+        with self._db_lock:
+            self._ensure_db()
+            messages = load_history(self.db_path, session_id)
+            with self._lock:
+                # Messages still waiting to be written are not in the database yet
+                for row_session, role, content in self._inflight + self._pending:
+                    if row_session == session_id:
+                        message = to_message(role, content)
+                        if message is not None:
+                            messages.append(message)
+                self._sessions[session_id] = _CachedSession(messages)
+                self._evict_overflow()
+                return list(messages)
+
+    def append(self, session_id: str, role: str, content: str):
+        """Adds a message to the session and queues it for persistence."""
+        with self._lock:
+            cached = self._sessions.get(session_id)
+            if cached is not None:
+                message = to_message(role, content)
+                if message is not None:
+                    cached.messages.append(message)
+                cached.last_access = time.monotonic()
+            self._pending.append((session_id, role, content))
+
+        if self._flush_task is None:
+            self.flush()
+
+    def flush(self):
+        """Writes all queued messages to SQLite in one transaction."""
+        with self._db_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                self._inflight, self._pending = self._pending, []
+            try:
+                self._ensure_db()
+                save_messages(self.db_path, self._inflight)
+            except sqlite3.Error as e:
+                print(f"Failed to flush chat history, will retry: {e}")
+                with self._lock:
+                    self._pending = self._inflight + self._pending
+            finally:
+                with self._lock:
+                    self._inflight = []
+
+    def evict_idle(self):
+        """Drops sessions that have not been accessed for `idle_seconds`."""
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            for session_id in [sid for sid, cached in self._sessions.items() if cached.last_access < cutoff]:
+                del self._sessions[session_id]
+
+    def _evict_overflow(self):
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cached_sessions": len(self._sessions),
+                "pending_writes": len(self._pending) + len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+                self.evict_idle()
+            except Exception as e:
+                print(f"Session cache maintenance failed: {e}")
+
+    def start(self):
+        """Starts the background flush task on the running event loop."""
+        with self._db_lock:
+            self._ensure_db()
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stops the background task and flushes everything still queued."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await asyncio.to_thread(self.flush)
@@ -1,4 +1,5 @@
 import os
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -13,19 +14,61 @@ class Settings(BaseSettings):
     It automatically reads variables from the .env file.
     """
     # Google API Key for Generative AI services (Gemini, Embeddings)
-    GOOGLE_API_KEY: str
+    # Keys are optional at import time; clients that need them fail on first use.
+    GOOGLE_API_KEY: Optional[str] = None
 
     # Serper API Key for the web search tool.
-    SERPER_API_KEY: str
+    SERPER_API_KEY: Optional[str] = None
 
     # Define the model names we will use throughout the application
     # This makes it easy to update models in one place.
     EMBEDDING_MODEL: str = "models/embedding-001"
+
+    # Embedding backend used for ingestion and retrieval: "google" (remote Gemini
+    # embeddings, EMBEDDING_MODEL) or "local" (offline CPU hashing embedder).
+    # Indexes record their model, so switching requires re-ingesting the books.
+    EMBEDDING_PROVIDER: str = "google"
+    LOCAL_EMBEDDING_DIMENSION: int = 1024
+    EMBEDDING_BATCH_SIZE: int = 256
     LLM_MODEL: str = "gemini-2.5-flash-preview-05-20"
 
     # Define paths for data and vector store for consistency
     # CORRECTED PATH: Goes up three levels from src/backend/core to the project root.
     DB_FAISS_PATH: str = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'vector_store')
+
+    # Token budgets for the conversation window sent to the LLM on every agent step.
+    # Recent turns are kept verbatim up to HISTORY_TOKEN_BUDGET; older turns are
+    # folded into a summary capped at HISTORY_SUMMARY_TOKEN_BUDGET.
+    HISTORY_TOKEN_BUDGET: int = 6000
+    HISTORY_SUMMARY_TOKEN_BUDGET: int = 800
+
+    # In-memory cache of active chat sessions. Sessions are evicted beyond
+    # SESSION_CACHE_MAX_SESSIONS or after SESSION_CACHE_IDLE_SECONDS without access,
+    # and new messages are written to SQLite every SESSION_FLUSH_INTERVAL_SECONDS.
+    SESSION_CACHE_MAX_SESSIONS: int = 512
+    SESSION_CACHE_IDLE_SECONDS: float = 1800
+    SESSION_FLUSH_INTERVAL_SECONDS: float = 0.5
+
+    # Number of loaded FAISS indexes kept in memory across requests.
+    RETRIEVER_CACHE_SIZE: int = 8
+
+    # Startup prewarm: when enabled, the graph and LLM clients are built and the
+    # PREWARM_BOOKS indexes (a JSON list in the environment) are loaded into the
+    # index cache before the server reports ready.
+    PREWARM_ON_STARTUP: bool = False
+    PREWARM_BOOKS: List[str] = []
+
+    # Admission control for /chat: graph runs in flight, requests allowed to wait
+    # for a slot (beyond that they get 429), how long they may wait, and how many
+    # requests one session may have running or queued (its turns run one at a time).
+    CHAT_MAX_CONCURRENCY: int = 8
+    CHAT_MAX_QUEUE: int = 32
+    CHAT_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    CHAT_MAX_PENDING_PER_SESSION: int = 2
+
+    # Batch question endpoint: maximum graph runs in flight and items per request.
+    BATCH_MAX_CONCURRENCY: int = 8
+    BATCH_MAX_ITEMS: int = 10000
     
     class Config:
         # Pydantic configuration to read from a .env file
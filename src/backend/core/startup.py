@@ -0,0 +1,37 @@
+import time
+from typing import List
+
+from .settings import settings
+
+def prewarm(book_ids: List[str], build_clients: bool = True) -> dict:
+    """
+    Does the expensive one-off work ahead of the first request: compiles the graph,
+    optionally builds the LLM and search clients, and loads the given books into
+    the index cache. Returns a timing report; failures are reported, not raised.
+    """
+    from .graph import get_graph
+    from .agents import get_llm_with_tools
+    from .rag import prewarm_books
+
+    report = {}
+    started = time.perf_counter()
+    get_graph()
+    report["graph_seconds"] = round(time.perf_counter() - started, 3)
+
+    if build_clients:
+        started = time.perf_counter()
+        try:
+            get_llm_with_tools()
+            report["clients_error"] = None
+        except Exception as e:
+            # Typically missing API keys; the server can still serve book listings
+            report["clients_error"] = str(e)
+            print(f"Prewarm: could not build LLM clients: {e}")
+        report["clients_seconds"] = round(time.perf_counter() - started, 3)
+
+    report["books"] = prewarm_books(book_ids)
+    return report
+
+def startup_books() -> List[str]:
+    """Books configured to be loaded before the server reports ready."""
+    return list(settings.PREWARM_BOOKS)
@@ -1,14 +1,47 @@
+import time
+# Measure cold start from the moment the API module starts importing
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import the routers from our api module
-from .api import chat, books # Added books router
+from .api import chat, books, batch # Added books router
+from .core.settings import settings
+from .core.startup import prewarm, startup_books
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Runs background services for the lifetime of the server.
+    Heavy clients are created lazily; when PREWARM_ON_STARTUP is set they are built
+    here instead, together with the configured hot books, before the server reports
+    ready. The session cache flushes queued chat history on shutdown.
+    """
+    app.state.ready = False
+    startup_report = {"import_seconds": round(_IMPORT_SECONDS, 3)}
+    chat.session_cache.start()
+    if settings.PREWARM_ON_STARTUP:
+        startup_report["prewarm"] = await asyncio.to_thread(prewarm, startup_books())
+    startup_report["cold_start_seconds"] = round(time.perf_counter() - _IMPORT_STARTED, 3)
+    app.state.startup_report = startup_report
+    app.state.ready = True
+    print(f"Backend ready in {startup_report['cold_start_seconds']}s (imports took {startup_report['import_seconds']}s).")
+    yield
+    app.state.ready = False
+    await chat.session_cache.stop()
 
 # Create the main FastAPI application instance
 app = FastAPI(
     title="Multi-Agent Programming Tutor API",
     description="An API for a multi-agent system to help study programming books.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # --- CORS (Cross-Origin Resource Sharing) ---
@@ -31,10 +64,21 @@ app.add_middleware(
 # We add tags to group related endpoints in the automatic API docs (e.g., at /docs)
 app.include_router(chat.router, prefix="/api/v1", tags=["Chat"])
 app.include_router(books.router, prefix="/api/v1/books", tags=["Books"]) # Added books router
+app.include_router(batch.router, prefix="/api/v1", tags=["Batch"])
 
 @app.get("/", tags=["Root"])
 async def read_root():
     """
     A simple root endpoint to confirm the API is running.
     """
-    return {"message": "Welcome to the Multi-Agent Programming Tutor API!"}
\ No newline at end of file
+    return {"message": "Welcome to the Multi-Agent Programming Tutor API!"}
+
+@app.get("/ready", tags=["Root"])
+async def readiness():
+    """
+    Readiness probe. Returns 503 until startup (including any prewarm) has finished,
+    then reports the measured cold-start timings.
+    """
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"ready": False})
+    return {"ready": True, "startup": app.state.startup_report}
\ No newline at end of file
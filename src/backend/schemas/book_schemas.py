@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class PrewarmRequest(BaseModel):
+    """
+    Defines the structure for a prewarm request.
+    If no book IDs are given, the books configured in PREWARM_BOOKS are loaded.
+    """
+    book_ids: Optional[List[str]] = None
+    build_clients: bool = True
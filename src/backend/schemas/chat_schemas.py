@@ -17,3 +17,18 @@ class ChatResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]] = []
 
+class BatchChatItem(BaseModel):
+    """
+    A single question in a batch request.
+    """
+    book_id: str
+    question: str
+    id: Optional[str] = None # Optional caller-supplied identifier echoed back in the result
+
+class BatchChatRequest(BaseModel):
+    """
+    Defines the structure for a batch of independent, history-less questions,
+    e.g. for offline evaluation runs.
+    """
+    items: List[BatchChatItem]
+    concurrency: Optional[int] = None # Defaults to BATCH_MAX_CONCURRENCY; capped by it
@@ -1,7 +1,15 @@
+import os
+import sys
 import streamlit as st
 import requests
 import json
 import time
+from requests.adapters import HTTPAdapter
+
+# Add the project root to the system path to allow for absolute imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.frontend.sse import SSEParser, FrameThrottle
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -16,6 +24,21 @@ CHAT_API_URL = f"{API_BASE_URL}/chat"
 UPLOAD_API_URL = f"{API_BASE_URL}/books/upload"
 LIST_BOOKS_API_URL = f"{API_BASE_URL}/books/list"
 HISTORY_API_URL = f"{API_BASE_URL}/history" # Endpoint to get chat history
+# Maximum re-renders per second of the streaming answer
+RENDER_FPS = 15
+
+# --- HTTP Session ---
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """
+    Returns a shared HTTP session, so every call reuses pooled keep-alive
+    connections to the backend instead of opening a new one.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 # --- Helper Functions ---
 @st.cache_data(ttl=60)
@@ -24,7 +47,7 @@ def get_available_books():
     Fetches the list of available books from the backend API.
     """
     try:
-        response = requests.get(LIST_BOOKS_API_URL)
+        response = get_http_session().get(LIST_BOOKS_API_URL)
         response.raise_for_status()
         return response.json().get("books", [])
     except requests.exceptions.RequestException as e:
@@ -36,13 +59,26 @@ def get_chat_history(session_id: str):
     Fetches the persistent chat history for a session from the backend.
     """
     try:
-        response = requests.get(f"{HISTORY_API_URL}/{session_id}")
+        response = get_http_session().get(f"{HISTORY_API_URL}/{session_id}")
         response.raise_for_status()
         return response.json().get("history", [])
     except requests.exceptions.RequestException:
         # It's okay if history doesn't exist for a new session, return empty list
         return []
 
+def collect_tokens(events) -> str:
+    """
+    Joins the tokens carried by a batch of SSE events, skipping malformed payloads.
+    """
+    tokens = ""
+    for event in events:
+        try:
+            data = json.loads(event.data)
+        except json.JSONDecodeError:
+            continue
+        tokens += data.get("token", "")
+    return tokens
+
 # --- Callback for File Uploader ---
 def handle_file_upload():
     """
@@ -53,7 +89,7 @@ def handle_file_upload():
         with st.spinner(f"Processing '{uploaded_file.name}'... This may take a few minutes."):
             try:
                 files = {'file': (uploaded_file.name, uploaded_file, 'application/pdf')}
-                response = requests.post(UPLOAD_API_URL, files=files)
+                response = get_http_session().post(UPLOAD_API_URL, files=files)
                 
                 if response.status_code == 200:
                     st.success(response.json().get("message", "Book processed successfully!"))
@@ -133,19 +169,21 @@ if prompt := st.chat_input("Ask a question about the book..."):
                 "book_id": st.session_state.current_book,
                 "session_id": st.session_state.session_id
             }
-            with requests.post(CHAT_API_URL, json=payload, stream=True) as r:
+            with get_http_session().post(CHAT_API_URL, json=payload, stream=True) as r:
+                if r.status_code == 429:
+                    retry_after = r.headers.get("Retry-After", "a few")
+                    raise requests.exceptions.HTTPError(f"The tutor is busy right now. Please retry in {retry_after} seconds.")
                 r.raise_for_status()
+                # Network chunks don't line up with SSE events, so parse incrementally
+                parser = SSEParser()
+                throttle = FrameThrottle(RENDER_FPS)
                 for chunk in r.iter_content(chunk_size=None):
-                    if chunk:
-                        data_str = chunk.decode('utf-8')
-                        if data_str.startswith('data: '):
-                            json_str = data_str[len('data: '):]
-                            try:
-                                data = json.loads(json_str)
-                                full_response += data.get("token", "")
-                                response_container.markdown(full_response + "▌")
-                            except json.JSONDecodeError:
-                                pass
+                    full_response += collect_tokens(parser.feed(chunk))
+                    # Re-render at most RENDER_FPS times per second, not on every token
+                    if throttle.ready():
+                        response_container.markdown(full_response + "▌")
+                # A stream ending in a lone CR only completes its last event here
+                full_response += collect_tokens(parser.close())
             response_container.markdown(full_response)
             # Append the final assistant response to the session state
             st.session_state.messages.append({"role": "assistant", "content": full_response})
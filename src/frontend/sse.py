@@ -0,0 +1,116 @@
+import codecs
+import time
+from typing import List, NamedTuple, Optional
+
+# --- Server-Sent Events Parsing ---
+# Network chunks do not line up with SSE frames: one chunk can hold several events,
+# and an event (or even a multi-byte UTF-8 character) can be split across chunks.
+# The parser below buffers incoming bytes and only emits complete events, following
+# the line-based format of the SSE specification.
+
+
+class SSEEvent(NamedTuple):
+    """A complete server-sent event."""
+    data: str
+    event: str = "message"
+    id: Optional[str] = None
+
+
+class SSEParser:
+    """
+    Incremental SSE parser. Feed it raw byte chunks as they arrive; it returns the
+    events completed by each chunk. Handles LF, CRLF and CR line endings, comment
+    lines, multi-line `data:` fields and UTF-8 characters split across chunks.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+        self._data: List[str] = []
+        self._event = ""
+        self._last_id: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """Consumes a chunk of bytes and returns the events it completed."""
+        self._buffer += self._decoder.decode(chunk)
+        events = []
+        while True:
+            line_end = self._find_line_end()
+            if line_end is None:
+                break
+            end, separator_length = line_end
+            line = self._buffer[:end]
+            self._buffer = self._buffer[end + separator_length:]
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def close(self) -> List[SSEEvent]:
+        """
+        Signals the end of the stream and returns the events it completed. A trailing
+        CR held back by `feed` can no longer be half of a CRLF, so it ends its line;
+        an unterminated last line is discarded, as the SSE specification requires.
+        """
+        self._buffer += self._decoder.decode(b"", final=True)
+        events = []
+        if self._buffer.endswith("\r"):
+            self._buffer += "\n"
+            events = self.feed(b"")
+        self._buffer = ""
+        self._data = []
+        self._event = ""
+        return events
+
+    def _find_line_end(self):
+        """Returns (index, separator length) of the first complete line ending, or None."""
+        lf = self._buffer.find("\n")
+        cr = self._buffer.find("\r")
+        if cr == -1 or (lf != -1 and lf < cr):
+            return (lf, 1) if lf != -1 else None
+        if cr + 1 == len(self._buffer):
+            # A trailing CR may be the first half of a CRLF still in flight
+            return None
+        return cr, 2 if self._buffer[cr + 1] == "\n" else 1
+
+    def _process_line(self, line: str) -> Optional[SSEEvent]:
+        if line == "":
+            return self._dispatch()
+        if line.startswith(":"):
+            return None  # Comment / keep-alive
+
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._event = value
+        elif field == "id":
+            self._last_id = value
+        return None
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        if not self._data:
+            self._event = ""
+            return None
+        event = SSEEvent(data="\n".join(self._data), event=self._event or "message", id=self._last_id)
+        self._data = []
+        self._event = ""
+        return event
+
+
+class FrameThrottle:
+    """Limits how often the UI re-renders while tokens stream in."""
+
+    def __init__(self, fps: float):
+        self.interval = 1.0 / fps
+        self._last = 0.0
+
+    def ready(self) -> bool:
+        """True if enough time has passed since the last frame; starts a new frame if so."""
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            return True
+        return False
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sys
+import pytest
+
+# Add the project root to the system path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.backend.core.admission import AdmissionController, AdmissionRejected
+
+# --- TEST CASES ---
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5, max_pending_per_session=2)
+        running = await controller.acquire("a")
+        queued = asyncio.ensure_future(controller.acquire("b"))
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 1
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("c")
+        assert rejected.value.retry_after >= 1
+
+        running.release()
+        (await queued).release()
+        stats = controller.stats()
+        assert stats["admitted"] == 2
+        assert stats["rejected"] == 1
+        assert stats["active"] == 0
+
+    asyncio.run(scenario())
+
+def test_turns_of_one_session_are_serialized():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=4, max_queue=4, queue_timeout=5, max_pending_per_session=2)
+        order = []
+
+        async def turn(name):
+            ticket = await controller.acquire("session")
+            order.append(f"start {name}")
+            await asyncio.sleep(0.01)
+            order.append(f"end {name}")
+            ticket.release()
+
+        await asyncio.gather(turn("first"), turn("second"))
+        assert order == ["start first", "end first", "start second", "end second"]
+
+        # A third concurrent turn for the same session exceeds the per-session limit
+        first = await controller.acquire("session")
+        second = asyncio.ensure_future(controller.acquire("session"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("session")
+        first.release()
+        (await second).release()
+
+    asyncio.run(scenario())
+
+def test_queue_timeout_rejects_and_frees_the_session():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.01, max_pending_per_session=2)
+        running = await controller.acquire("a")
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("b")
+        running.release()
+        (await controller.acquire("b")).release()
+        assert controller._session_locks == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+from collections import OrderedDict
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+# Add the project root to the system path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.backend.main import app
+import src.backend.api.batch as batch_api
+
+client = TestClient(app)
+
+# --- HELPERS ---
+
+class FakeGraph:
+    """Stands in for the compiled graph: echoes the question, fails on 'boom'."""
+
+    def __init__(self, load_book=None):
+        self.load_book = load_book
+
+    async def ainvoke(self, state, config):
+        if self.load_book is not None:
+            # Like the retriever node, fetch the book's index for every question
+            self.load_book(state["book_id"])
+        if state["question"] == "boom":
+            raise RuntimeError("graph failed")
+        return {"messages": state["messages"] + [AIMessage(content=f"answer to {state['question']}")]}
+
+class FakeIndexCache:
+    """Mimics the shared LRU index cache, recording every book it loads from disk."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.cached = OrderedDict()
+        self.loads = []
+
+    def __call__(self, book_id: str):
+        if book_id in self.cached:
+            self.cached.move_to_end(book_id)
+        else:
+            self.loads.append(book_id)
+            self.cached[book_id] = object()
+            while len(self.cached) > self.size:
+                self.cached.popitem(last=False)
+        return self.cached[book_id]
+
+# --- TEST CASES ---
+
+def test_batch_streams_results_and_summary(monkeypatch):
+    monkeypatch.setattr(batch_api, "get_graph", lambda: FakeGraph())
+    monkeypatch.setattr(batch_api, "load_vector_store", lambda book_id: None)
+    items = [{"book_id": "book", "question": f"q{i}", "id": str(i)} for i in range(5)]
+    items.append({"book_id": "book", "question": "boom"})
+
+    response = client.post("/api/v1/chat/batch", json={"items": items, "concurrency": 2})
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results, summary = lines[:-1], lines[-1]["summary"]
+    assert len(results) == 6
+    by_index = {result["index"]: result for result in results}
+    assert by_index[0]["answer"] == "answer to q0"
+    assert by_index[0]["id"] == "0"
+    assert by_index[5]["error"] == "graph failed"
+    assert all("latency_ms" in result for result in results)
+    assert summary["items"] == 6
+    assert summary["failed"] == 1
+    assert summary["concurrency"] == 2
+    assert summary["throughput_per_second"] > 0
+
+def test_batch_rejects_empty_batch():
+    response = client.post("/api/v1/chat/batch", json={"items": []})
+    assert response.status_code == 400
+
+def test_batch_loads_each_book_once_within_cache_size(monkeypatch):
+    index_cache = FakeIndexCache(size=2)
+    monkeypatch.setattr(batch_api, "get_graph", lambda: FakeGraph(load_book=index_cache))
+    monkeypatch.setattr(batch_api, "load_vector_store", index_cache)
+    monkeypatch.setattr(batch_api.settings, "RETRIEVER_CACHE_SIZE", 2)
+    # Books interleaved, and more of them than the cache holds
+    items = [{"book_id": f"book{i % 4}", "question": f"q{i}"} for i in range(12)]
+
+    response = client.post("/api/v1/chat/batch", json={"items": items, "concurrency": 1})
+
+    assert response.status_code == 200
+    # Each book is loaded from disk exactly once: by the prewarm or by its first item
+    assert sorted(index_cache.loads) == ["book0", "book1", "book2", "book3"]
+    # Items run grouped by book
+    results = [json.loads(line) for line in response.text.splitlines()[:-1]]
+    assert [r["book_id"] for r in results] == sorted(r["book_id"] for r in results)
+
+def test_batch_rejects_zero_concurrency(monkeypatch):
+    monkeypatch.setattr(batch_api, "get_graph", lambda: FakeGraph())
+    items = [{"book_id": "book", "question": "q"}]
+
+    for concurrency in (0, -1):
+        response = client.post("/api/v1/chat/batch", json={"items": items, "concurrency": concurrency})
+        assert response.status_code == 400
@@ -82,3 +82,27 @@ def test_list_books_with_valid_and_empty_dirs():
 
     # The final list should only have one book
     assert len(response_data["books"]) == 1
+
+def test_prewarm_reports_missing_books():
+    """
+    Test the /prewarm endpoint: unknown books are reported as not loaded
+    instead of failing the whole request.
+    """
+    response = client.post("/api/v1/books/prewarm", json={"book_ids": ["missing_book"], "build_clients": False})
+
+    assert response.status_code == 200
+    report = response.json()
+    assert "graph_seconds" in report
+    assert report["books"]["missing_book"]["loaded"] is False
+
+def test_ready_after_startup():
+    """
+    Test that the readiness probe reports ready with cold-start timings once
+    the application lifespan has started.
+    """
+    with TestClient(app) as started_client:
+        response = started_client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+    assert "cold_start_seconds" in response.json()["startup"]
@@ -0,0 +1,93 @@
+import os
+import sys
+from langchain_core.documents import Document
+
+# Add the project root to the system path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.backend.core import rag
+from src.backend.core.chapters import build_chapter_index, find_section, page_sections, save_chapter_index
+from src.backend.core.embeddings import get_embeddings, write_index_embedding_info
+
+# --- HELPERS ---
+
+OUTLINE = [
+    {"title": "Preface", "level": 0, "start_page": 0},
+    {"title": "Chapter 1 Getting Started", "level": 0, "start_page": 2},
+    {"title": "1.1 Installing Python", "level": 1, "start_page": 3},
+    {"title": "Chapter 2 Generators", "level": 0, "start_page": 5},
+    {"title": "2.1 The yield statement", "level": 1, "start_page": 6},
+]
+
+# --- TEST CASES ---
+
+def test_chapter_index_page_ranges_and_sections():
+    chapters = build_chapter_index(OUTLINE, num_pages=9)
+
+    ranges = {s["title"]: (s["start_page"], s["end_page"]) for s in chapters}
+    assert ranges["Chapter 1 Getting Started"] == (2, 4)
+    assert ranges["1.1 Installing Python"] == (3, 4)
+    assert ranges["Chapter 2 Generators"] == (5, 8)
+
+    sections = page_sections(chapters, 9)
+    assert sections[2]["title"] == "Chapter 1 Getting Started"
+    assert sections[6]["title"] == "2.1 The yield statement"
+    assert sections[6]["chapter"] == "Chapter 2 Generators"
+
+def test_find_section_by_number_and_title():
+    chapters = build_chapter_index(OUTLINE, num_pages=9)
+
+    assert find_section(chapters, "Chapter 2")["title"] == "Chapter 2 Generators"
+    assert find_section(chapters, "1")["title"] == "Chapter 1 Getting Started"
+    assert find_section(chapters, "yield")["title"] == "2.1 The yield statement"
+    assert find_section(chapters, "chapter 9") is None
+
+def test_search_is_restricted_to_the_chapter(tmp_path, monkeypatch):
+    from langchain_community.vectorstores import FAISS
+
+    monkeypatch.setattr(rag.settings, "EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(rag.settings, "DB_FAISS_PATH", str(tmp_path))
+    topics = ["preface", "preface", "install python", "install pip", "install venv",
+              "generators yield", "yield from", "generator expressions", "install generators"]
+    docs = [Document(page_content=f"{topic} " * 10, metadata={"page": page}) for page, topic in enumerate(topics)]
+    book_dir = tmp_path / "book"
+    FAISS.from_documents(docs, get_embeddings("local")).save_local(str(book_dir))
+    write_index_embedding_info(str(book_dir))
+    save_chapter_index(str(book_dir), build_chapter_index(OUTLINE, num_pages=9))
+
+    results, note = rag.search_book("book", "install", k=3, chapter="Generators")
+
+    assert note is None
+    assert results and all(5 <= doc.metadata["page"] <= 8 for doc in results)
+    assert results[0].metadata["page"] == 8
+
+    results, note = rag.search_book("book", "install", chapter="Chapter 7")
+    assert results == [] and "Available chapters" in note
+
+def test_search_reports_embedding_mismatch_as_note(tmp_path, monkeypatch):
+    from langchain_community.vectorstores import FAISS
+
+    monkeypatch.setattr(rag.settings, "EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(rag.settings, "DB_FAISS_PATH", str(tmp_path))
+    docs = [Document(page_content="install python", metadata={"page": 0})]
+    # No embedding info file: a legacy index built with the Google model
+    FAISS.from_documents(docs, get_embeddings("local")).save_local(str(tmp_path / "book"))
+
+    results, note = rag.search_book("book", "install", start_page=0, end_page=3)
+
+    assert results == []
+    assert note.startswith("Error:") and "Re-ingest the book" in note
+
+def test_retriever_tool_uses_one_based_pages(monkeypatch):
+    from src.backend.core import agents
+
+    calls = []
+    def fake_search_book(book_id, query, chapter=None, start_page=None, end_page=None):
+        calls.append((start_page, end_page))
+        return [Document(page_content="yield from", metadata={"source": "book.pdf", "page": 6})], None
+    monkeypatch.setattr(agents, "search_book", fake_search_book)
+
+    output = agents.BookRetrieverTool(query="yield", start_page=7, end_page=9).run("book")
+
+    assert calls == [(6, 8)]
+    assert "Page: 7" in output
@@ -0,0 +1,42 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add the project root to the system path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.backend.core import embeddings as embeddings_module
+from src.backend.core.embeddings import (
+    HashingEmbeddings, EmbeddingMismatchError, check_index_embedding, write_index_embedding_info,
+)
+
+# --- TEST CASES ---
+
+def test_hashing_embeddings_are_normalized_and_batch_independent():
+    embedder = HashingEmbeddings(dimension=256, batch_size=2)
+    texts = ["def foo(): return 1", "Python generators yield values", "", "list comprehension in python"]
+
+    vectors = np.array(embedder.embed_documents(texts))
+
+    assert vectors.shape == (4, 256)
+    assert np.allclose(np.linalg.norm(vectors[[0, 1, 3]], axis=1), 1.0)
+    # Batching must not change the result, and queries embed like documents
+    assert np.allclose(vectors[1], embedder.embed_query(texts[1]))
+    # Lexically similar texts score higher than unrelated ones
+    query = np.array(embedder.embed_query("python list comprehension"))
+    assert query @ vectors[3] > query @ vectors[0]
+
+def test_index_built_with_another_model_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(embeddings_module.settings, "EMBEDDING_PROVIDER", "local")
+    write_index_embedding_info(str(tmp_path))
+    check_index_embedding(str(tmp_path))
+
+    monkeypatch.setattr(embeddings_module.settings, "EMBEDDING_PROVIDER", "google")
+    with pytest.raises(EmbeddingMismatchError):
+        check_index_embedding(str(tmp_path))
+
+def test_legacy_index_is_assumed_to_use_google_embeddings(tmp_path, monkeypatch):
+    monkeypatch.setattr(embeddings_module.settings, "EMBEDDING_PROVIDER", "local")
+    with pytest.raises(EmbeddingMismatchError):
+        check_index_embedding(str(tmp_path))
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+from langchain_core.documents import Document
+
+# Add the project root to the system path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts import ingest_book
+from src.backend.core.embeddings import get_embeddings
+from src.backend.core.settings import settings
+
+# --- HELPERS ---
+
+class FakePDFLoader:
+    """Reads a text file as a one-page PDF; anything else is rejected like a corrupt PDF."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def load(self):
+        with open(self.file_path, encoding="utf-8") as f:
+            text = f.read()
+        if not text.startswith("text:"):
+            raise ValueError("EOF marker not found")
+        return [Document(page_content=text * 20, metadata={"source": self.file_path, "page": 0})]
+
+_create_vector_db_for_book = ingest_book.create_vector_db_for_book
+
+def crashing_create_vector_db_for_book(file_path, book_id, rate_limiter=None):
+    """Kills the worker process outright on the 'crash' book, as an out-of-memory kill would."""
+    if book_id == "crash":
+        os._exit(1)
+    return _create_vector_db_for_book(file_path, book_id, rate_limiter)
+
+# --- TEST CASES ---
+
+def test_rate_limiter_spaces_requests():
+    limiter = ingest_book.RateLimiter(requests_per_minute=600)
+    started = time.perf_counter()
+    for _ in range(4):
+        limiter.acquire()
+    # The first request goes out immediately, the next three wait 60/600 s each
+    assert 0.28 <= time.perf_counter() - started < 1.0
+
+def test_rate_limiter_disabled_by_default():
+    limiter = ingest_book.RateLimiter()
+    started = time.perf_counter()
+    for _ in range(100):
+        limiter.acquire()
+    assert time.perf_counter() - started < 0.1
+
+def test_pipeline_isolates_bad_and_crashing_books(tmp_path, monkeypatch, capsys):
+    data_dir, store_dir = tmp_path / "data", tmp_path / "vector_store"
+    data_dir.mkdir()
+    for book_id in ("alpha", "beta", "gamma", "crash"):
+        (data_dir / f"{book_id}.pdf").write_text(f"text: generators in {book_id} ", encoding="utf-8")
+    (data_dir / "bad.pdf").write_text("not a pdf", encoding="utf-8")
+
+    monkeypatch.setattr(ingest_book, "DATA_DIR", str(data_dir))
+    monkeypatch.setattr(ingest_book, "VECTOR_STORE_DIR", str(store_dir))
+    monkeypatch.setattr(ingest_book, "PyPDFLoader", FakePDFLoader)
+    monkeypatch.setattr(ingest_book, "extract_outline", lambda file_path: [])
+    monkeypatch.setattr(ingest_book, "get_embeddings", lambda: get_embeddings("local"))
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "local")
+    # Worker processes are forked, so they inherit the patched module
+    monkeypatch.setattr(ingest_book, "create_vector_db_for_book", crashing_create_vector_db_for_book)
+
+    results = ingest_book.run_ingestion_pipeline(workers=2)
+
+    by_book = {r["book_id"]: r for r in results}
+    assert sorted(by_book) == ["alpha", "bad", "beta", "crash", "gamma"]
+    for book_id in ("alpha", "beta", "gamma"):
+        assert by_book[book_id]["ok"] and by_book[book_id]["chunks"] > 0
+        assert (store_dir / book_id / "index.faiss").exists()
+    assert not by_book["bad"]["ok"] and "EOF marker" in by_book["bad"]["error"]
+    assert not by_book["crash"]["ok"] and "Worker process died" in by_book["crash"]["error"]
+
+    # Failures are reported per book on stderr, where the upload endpoint reads them
+    err = capsys.readouterr().err
+    assert "FAILED bad:" in err and "FAILED crash:" in err
+    assert "FAILED alpha" not in err
@@ -0,0 +1,95 @@
+import os
+import sys
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, SystemMessage
+
+# Add the project root to the system path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.backend.core.memory import ConversationWindow
+
+# --- HELPERS ---
+
+def make_history(turns: int, size: int = 400, start: int = 0):
+    """Builds a history of `turns` question/answer pairs of roughly `size` characters each."""
+    history = []
+    for i in range(start, start + turns):
+        history.append(HumanMessage(content=f"question {i} " + "q" * size))
+        history.append(AIMessage(content=f"answer {i} " + "a" * size))
+    return history
+
+# --- TEST CASES ---
+
+def test_short_history_is_sent_verbatim():
+    window = ConversationWindow(token_budget=10_000, summary_token_budget=500)
+    messages = make_history(3) + [HumanMessage(content="latest question")]
+
+    prompt = window.build("system", messages, "session")
+
+    assert isinstance(prompt[0], SystemMessage)
+    assert prompt[0].content == "system"
+    assert prompt[1:] == messages
+
+def test_old_turns_are_summarized_and_tool_outputs_dropped():
+    window = ConversationWindow(token_budget=400, summary_token_budget=500)
+    old_tool_call = AIMessage(content="", tool_calls=[{"name": "BookRetrieverTool", "args": {"query": "x"}, "id": "1"}])
+    history = make_history(2)
+    history[1:1] = [old_tool_call, ToolMessage(content="old tool output", tool_call_id="1")]
+    history += make_history(1, size=100, start=2)
+    current_tool_call = AIMessage(content="", tool_calls=[{"name": "BookRetrieverTool", "args": {"query": "y"}, "id": "2"}])
+    current = [HumanMessage(content="latest question"), current_tool_call, ToolMessage(content="new tool output", tool_call_id="2")]
+
+    prompt = window.build("system", history + current, "session")
+
+    # The current turn (including its tool output) is always kept verbatim
+    assert prompt[-3:] == current
+    # Old tool outputs are never resent
+    assert all(msg.content != "old tool output" for msg in prompt)
+    # The oldest turns were folded into the system prompt summary
+    assert "question 0" in prompt[0].content
+    assert all("question 0" not in msg.content for msg in prompt[1:])
+    assert "question 1" in prompt[1].content
+
+def test_summary_is_extended_incrementally():
+    window = ConversationWindow(token_budget=300, summary_token_budget=2_000)
+    history = make_history(4)
+
+    window.build("system", history + [HumanMessage(content="next")], "session")
+    first_entry = window._summaries["session"]
+    folded_before = first_entry.folded
+    lines_before = list(first_entry.lines)
+
+    history += [HumanMessage(content="next"), AIMessage(content="reply " + "r" * 400)]
+    prompt = window.build("system", history + [HumanMessage(content="another")], "session")
+
+    entry = window._summaries["session"]
+    assert entry is first_entry
+    assert entry.folded > folded_before
+    # Previously summarized lines are reused rather than recomputed
+    assert entry.lines[:len(lines_before)] == lines_before
+    assert "question 3" in prompt[0].content
+
+def test_fold_point_does_not_move_back_after_a_tool_turn(monkeypatch):
+    from src.backend.core import memory
+
+    window = ConversationWindow(token_budget=1_000, summary_token_budget=2_000)
+    history = make_history(8)
+    question = HumanMessage(content="what does chapter 2 say?")
+    tool_call = AIMessage(content="", tool_calls=[{"name": "BookRetrieverTool", "args": {"query": "x"}, "id": "1"}])
+    tool_output = ToolMessage(content="retrieved " + "t" * 2_400, tool_call_id="1")
+
+    # Router step 2 of a tool-using turn: the large tool output folds more history
+    window.build("system", history + [question], "session")
+    window.build("system", history + [question, tool_call, tool_output], "session")
+    folded = window._summaries["session"].folded
+
+    calls = []
+    original = memory.summarize_turn
+    monkeypatch.setattr(memory, "summarize_turn", lambda turn: calls.append(turn) or original(turn))
+
+    # The next question is short again, but the old turns stay folded
+    history += [question, tool_call, tool_output, AIMessage(content="short answer")]
+    prompt = window.build("system", history + [HumanMessage(content="and chapter 3?")], "session")
+
+    assert calls == []
+    assert window._summaries["session"].folded == folded
+    assert all("question 0" not in msg.content for msg in prompt[1:])
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import sys
+from unittest import mock
+from langchain_core.messages import HumanMessage, AIMessage
+
+# Add the project root to the system path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.backend.core import session_cache as session_cache_module
+from src.backend.core.session_cache import SessionCache, init_db, load_history
+
+# --- HELPERS ---
+
+def make_cache(db_path: str, **overrides) -> SessionCache:
+    init_db(db_path)
+    options = dict(max_sessions=16, idle_seconds=60, flush_interval=0.01)
+    options.update(overrides)
+    return SessionCache(db_path, **options)
+
+# --- TEST CASES ---
+
+def test_cached_session_is_served_without_database_reads(tmp_path):
+    cache = make_cache(str(tmp_path / "history.db"))
+    cache.get_history("s1")
+    cache.append("s1", "user", "hello")
+    cache.append("s1", "assistant", "hi there")
+
+    with mock.patch.object(session_cache_module, "load_history", side_effect=AssertionError("unexpected read")):
+        history = cache.get_history("s1")
+
+    assert [type(m) for m in history] == [HumanMessage, AIMessage]
+    assert cache.stats()["hits"] == 1
+
+def test_background_writes_are_batched_and_flushed_on_stop(tmp_path):
+    db_path = str(tmp_path / "history.db")
+    cache = make_cache(db_path, flush_interval=60)
+
+    async def run_session():
+        cache.start()
+        cache.append("s1", "user", "question")
+        cache.append("s1", "assistant", "answer")
+        # Nothing is written until the background task flushes
+        assert load_history(db_path, "s1") == []
+        await cache.stop()
+
+    asyncio.run(run_session())
+
+    assert [m.content for m in load_history(db_path, "s1")] == ["question", "answer"]
+
+def test_evicted_session_reloads_with_pending_writes(tmp_path):
+    db_path = str(tmp_path / "history.db")
+    cache = make_cache(db_path, max_sessions=1)
+    cache._flush_task = object()  # Pretend the background flusher is running
+    cache.append("s1", "user", "first")
+    cache.get_history("s2")  # Evicts nothing yet: s1 was never loaded
+    cache.get_history("s1")  # Evicts s2
+    cache.append("s1", "assistant", "second")
+
+    assert [m.content for m in cache.get_history("s1")] == ["first", "second"]
+    cache._flush_task = None
+    cache.flush()
+    assert [m.content for m in load_history(db_path, "s1")] == ["first", "second"]
@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+
+# Add the project root to the system path to allow for absolute imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.frontend.sse import SSEParser, FrameThrottle
+
+# --- HELPERS ---
+
+# A stream as recorded from the /chat endpoint, with a keep-alive comment
+RECORDED_STREAM = (
+    b': keep-alive\n\n'
+    + 'data: {"token": "Generators are lazy "}\n\n'.encode("utf-8")
+    + 'data: {"token": "iterators — café 🐍"}\n\n'.encode("utf-8")
+    + 'data: {"token": "done."}\n\n'.encode("utf-8")
+)
+
+def parse_in_chunks(stream: bytes, chunk_size: int):
+    parser = SSEParser()
+    events = []
+    for start in range(0, len(stream), chunk_size):
+        events.extend(parser.feed(stream[start:start + chunk_size]))
+    return events
+
+def tokens(events):
+    return "".join(json.loads(event.data)["token"] for event in events)
+
+# --- TEST CASES ---
+
+def test_split_frames_are_reassembled():
+    """Every chunking of the recorded stream, down to single bytes, yields the same events."""
+    expected = "Generators are lazy iterators — café 🐍done."
+    for chunk_size in (1, 2, 3, 7, 16, 64):
+        events = parse_in_chunks(RECORDED_STREAM, chunk_size)
+        assert len(events) == 3
+        assert tokens(events) == expected
+
+def test_merged_frames_in_one_chunk():
+    events = SSEParser().feed(RECORDED_STREAM)
+    assert [json.loads(e.data)["token"] for e in events] == ["Generators are lazy ", "iterators — café 🐍", "done."]
+
+def test_crlf_multiline_data_and_event_fields():
+    stream = b'event: token\r\nid: 7\r\ndata: line one\r\ndata: line two\r\n\r\ndata:no-space\r\r\n'
+    parser = SSEParser()
+    events = []
+    # Split between the CR and LF of a CRLF pair
+    split = stream.index(b'data: line one\r\n') + len(b'data: line one\r')
+    for chunk in (stream[:split], stream[split:]):
+        events.extend(parser.feed(chunk))
+
+    assert events[0].event == "token"
+    assert events[0].id == "7"
+    assert events[0].data == "line one\nline two"
+    assert events[1].data == "no-space"
+    assert events[1].event == "message"
+
+def test_incomplete_event_is_not_emitted():
+    parser = SSEParser()
+    assert parser.feed(b'data: {"token": "partial"}\n') == []
+    assert parser.feed(b'\n')[0].data == '{"token": "partial"}'
+
+def test_close_flushes_a_trailing_cr():
+    parser = SSEParser()
+    assert parser.feed(b'data: {"token": "last"}\r\r') == []
+    events = parser.close()
+    assert tokens(events) == "last"
+
+def test_close_discards_an_unterminated_event():
+    parser = SSEParser()
+    parser.feed(b'data: {"token": "cut off"}\n')
+    assert parser.close() == []
+
+def test_frame_throttle_limits_renders():
+    throttle = FrameThrottle(fps=1)
+    assert throttle.ready() is True
+    assert throttle.ready() is False